@@ -1,13 +1,25 @@
 import streamlit as st
-import fitz  # PyMuPDF
-from langchain_community.embeddings import HuggingFaceEmbeddings
-import chromadb
 import uuid
-from groq import Groq
-import re
-import json
 import os
+import logging
+import metrics
+from llm import EventLoopThread, TokenStream
+from interview_context import InterviewContext
+from extraction import ResumeTooLarge
+from retention import RETENTION_INTERVAL, SessionLease, start_retention
+from session_store import StoredReports, replay, setup_session_store
+from question_plan import QUESTION_PLAN_ENABLED, abuild_question_plan, aplanned_question
+from interview_core import (
+    warm_up, get_embedding_model,
+    ingest_resume, touch_user, retrieve_resume, aretrieve_resume, TECHNICAL_SECTIONS, BACKGROUND_SECTIONS,
+    azero_agent_greeting, atechnical_agent_question, aclarification_agent_response,
+    astrict_agent_monitor, get_report
+)
 # -------------------- Configuration --------------------
+logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO"))
+logger = logging.getLogger(__name__)
+MAX_TECHNICAL_QUESTIONS = int(os.getenv("MAX_TECHNICAL_QUESTIONS", "5"))
+UI_POLL_INTERVAL = float(os.getenv("UI_POLL_INTERVAL", "0.25"))  # seconds between checks on a running turn
 st.set_page_config(
     page_title="AI Interview Coach",
     page_icon="💼",
@@ -131,236 +143,54 @@ st.markdown("""
 
 # -------------------- Core Functions --------------------
 @st.cache_resource
-def setup_embeddings():
-    return HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
+def setup_event_loop():
+    # One loop per process: work started in one script run is still running in the next
+    return EventLoopThread(workers=int(os.getenv("LLM_WORKERS", "8")))
 
+# -------------------- Initialize Components --------------------
 @st.cache_resource
-def setup_chromadb():
-    client = chromadb.PersistentClient(path="./chroma_db")
-    return client.get_or_create_collection(name="resumes")
-
-def extract_text_from_resume(file):
-    if file.type == "application/pdf":
-        doc = fitz.open(stream=file.read(), filetype="pdf")
-        return "\n".join([page.get_text("text") for page in doc])
-    elif file.type == "text/plain":
-        return file.read().decode("utf-8")
-    return ""
-
-def extract_candidate_name(resume_text):
-    # Simple regex to extract names (look for first capitalized words)
-    name_match = re.search(r"([A-Z][a-z]+\s+[A-Z][a-z]+)", resume_text[:500])
-    if name_match:
-        return name_match.group(1)
-    return "Candidate"
-
-def store_resume(text, user_id):
-    chunks = [text[i:i+512] for i in range(0, len(text), 512)]
-    for i, chunk in enumerate(chunks):
-        embedding = embedding_model.embed_query(chunk)
-        collection.add(
-            ids=[f"{user_id}-{i}"],
-            embeddings=[embedding],
-            metadatas=[{"text": chunk}]
-        )
-    return extract_candidate_name(text)
-
-def retrieve_resume(user_id, query):
-    query_embedding = embedding_model.embed_query(query)
-    results = collection.query(query_embeddings=[query_embedding], n_results=3)
-    return "\n".join([doc["text"] for doc in results["metadatas"][0]])
-
-def generate_groq_response(prompt, agent_type, temperature=0.7):
-    # Different system prompts based on agent type
-    system_prompts = {
-        "zero_agent": """You are the initial interviewer. Your role is to warmly greet the candidate by name and ask general background questions to make them comfortable before transitioning to technical topics. Be conversational, friendly, and engaging. Focus on understanding their motivation, work history, and personality.""",
-        
-        "technical_agent": """You are an expert technical interviewer. Analyze the candidate's resume thoroughly and ask highly relevant technical questions that demonstrate your understanding of their background. Your questions should be challenging but fair, focusing on their claimed skills and past projects. Phrase questions clearly and directly.""",
-        
-        "clarification_agent": """You are a supportive interviewer who helps clarify questions when candidates need assistance. When a candidate seems confused or directly asks for clarification, explain the question in simpler terms with examples. If they give a partial answer, ask follow-up questions to help them elaborate. Your goal is to maintain conversation flow and help candidates showcase their knowledge.""",
-        
-        "report_agent": """You are an interview assessment specialist. Create a detailed, constructive report of the interview without scoring or grading the candidate. Identify correct answers with green text and areas for improvement with red text. Focus on suggesting specific technical topics the candidate should study further rather than platforms or resources. Be encouraging and specific in your feedback."""
-    }
-    
-    client = Groq(api_key=os.getenv("GROQ_API_KEY"))
-    response = client.chat.completions.create(
-        model="llama-3.3-70b-versatile",
-        messages=[
-            {"role": "system", "content": system_prompts.get(agent_type, "You are an AI interview coach.")},
-            {"role": "user", "content": prompt}
-        ],
-        temperature=temperature,
-        max_tokens=800
-    )
-    return response.choices[0].message.content
-
-# -------------------- Agent Functions --------------------
-def zero_agent_greeting(resume_data, candidate_name):
-    prompt = f"""
-    Resume Data: {resume_data}
-    Candidate Name: {candidate_name}
-    
-    Generate a brief, warm greeting for {candidate_name}. The greeting should:
-    1. Begin with "Hello [Candidate Name]" 
-    2. Very briefly mention something from their resume (one skill or experience)
-    3. Ask ONE simple question about their most recent job or experience
-    4. Keep it extremely concise (2-3 short sentences maximum)
-    
-    The greeting must be brief as it will be converted to voice later.
-    """
-    return generate_groq_response(prompt, "zero_agent", temperature=0.7)
-
-def technical_agent_question(resume_data, interview_history, question_count):
-    difficulty = "introductory" if question_count < 2 else "intermediate" if question_count < 4 else "advanced"
-    
-    prompt = f"""
-    Resume Data: {resume_data}
-    Interview History: {interview_history}
-    Question Number: {question_count + 1}
-    Difficulty: {difficulty}
-    
-    Generate a relevant technical interview question based on the candidate's resume. The question should:
-    1. Be specific to skills or experiences mentioned in their resume
-    2. Feel like it's coming from someone who has read their background
-    3. Be appropriately challenging based on their experience level
-    4. Be directly relevant to their field
-    5. Be clearly phrased as a question (no preambles or explanations)
-    """
-    return generate_groq_response(prompt, "technical_agent", temperature=0.7)
-
-def clarification_agent_response(question, candidate_response, resume_data):
-    # Check if the response indicates confusion or asks for clarification
-    needs_clarification = any(phrase in candidate_response.lower() for phrase in 
-                             ["i don't understand", "can you explain", "not sure", "what do you mean", 
-                              "confused", "unclear", "can you clarify", "don't know what", "?"])
-    
-    if needs_clarification:
-        prompt = f"""
-        Original Question: {question}
-        Candidate Response: {candidate_response}
-        Resume Data: {resume_data}
-        
-        The candidate needs clarification. Your task is to:
-        1. Acknowledge their confusion
-        2. Explain the question in simpler terms
-        3. Provide a concrete example to illustrate what you're asking
-        4. Rephrase the question in a more approachable way
-        
-        IMPORTANT: Respond in a direct, conversational manner WITHOUT any explanation of your reasoning.
-        """
-        return generate_groq_response(prompt, "clarification_agent", temperature=0.6)
-    else:
-        # Check if the answer is incomplete and needs a follow-up
-        prompt = f"""
-        Original Question: {question}
-        Candidate Response: {candidate_response}
-        Resume Data: {resume_data}
-        
-        Evaluate if this response is complete or needs a follow-up.
-        If the response is thorough and complete, respond with "COMPLETE".
-        If the response is partial or could benefit from elaboration, provide a specific follow-up question.
-        If the response is off-topic, provide a more specific version of the original question.
-        
-        IMPORTANT: If providing a follow-up question, give ONLY the question itself without any explanation of why you're asking it.
-        """
-        follow_up = generate_groq_response(prompt, "clarification_agent", temperature=0.6)
-        
-        if "COMPLETE" in follow_up:
-            return None
-        else:
-            # Filter out any reasoning or explanation before the question
-            # This regex attempts to find the actual question
-            question_match = re.search(r"(?:To help|I would|Let me|Could you|What|How|Why|Can you|Tell me|Describe|Explain).*\?", follow_up)
-            if question_match:
-                return question_match.group(0)
-            return follow_up
-        
-def strip_markdown(text):
-    """Remove markdown formatting from text"""
-    # Remove bold/italic markers
-    text = re.sub(r'\*\*(.*?)\*\*', r'\1', text)
-    text = re.sub(r'\*(.*?)\*', r'\1', text)
-    # Remove backticks
-    text = re.sub(r'`(.*?)`', r'\1', text)
-    # Remove links
-    text = re.sub(r'\[(.*?)\]\((.*?)\)', r'\1', text)
-    # Remove headers
-    text = re.sub(r'^#+\s+', '', text, flags=re.MULTILINE)
-    # Remove blockquotes
-    text = re.sub(r'^>\s+', '', text, flags=re.MULTILINE)
-    # Remove horizontal rules
-    text = re.sub(r'^\s*[-*_]{3,}\s*$', '', text, flags=re.MULTILINE)
-    # Remove list markers
-    text = re.sub(r'^\s*[-*+]\s+', '• ', text, flags=re.MULTILINE)
-    text = re.sub(r'^\s*\d+\.\s+', '', text, flags=re.MULTILINE)
-    
-    return text
-
-def report_agent_feedback(interview_data, resume_data):
-    questions_answers = "\n\n".join([
-        f"Q{i+1}: {qa['question']}\nAnswer: {qa['answer']}" 
-        for i, qa in enumerate(interview_data)
-    ])
-    
-    prompt = f"""
-    Resume Data: {resume_data}
-    
-    Interview Transcript:
-    {questions_answers}
-    
-    Generate a detailed, visually appealing interview report that:
-    1. Analyzes each answer without scoring or grading
-    2. Identifies correct information (prefix with "CORRECT: ")
-    3. Identifies areas for improvement (prefix with "IMPROVE: ")
-    4. Recommends 3-5 specific technical topics (not platforms) the candidate should focus on
-    
-    Format guidelines:
-    - Use emojis to make sections more engaging (✅ for correct points, 💡 for improvement areas)
-    - ABSOLUTELY NO MARKDOWN SYNTAX - use plain text only without asterisks, backticks, hashes, etc.
-    - Use simple formatting that works well in HTML
-    - For each question, provide concise bullet-point style feedback
-    - Keep language encouraging and constructive
-    
-    Format the report with these sections:
-    - QUESTION ANALYSIS (for each question)
-    - KEY STRENGTHS
-    - FOCUS AREAS
-    - RECOMMENDED TOPICS
-    
-    Do not include any numerical scores or grades.
-    """
-    feedback = generate_groq_response(prompt, "report_agent", temperature=0.7)
-    return strip_markdown(feedback)  # Apply the markdown stripper
+def setup_components():
+    # Loaded in the background so the upload widget renders straight away
+    return warm_up()
 
-def strict_agent_monitor(candidate_response):
-    prompt = f"""
-    Candidate Response: "{candidate_response}"
-
-    Check for these behaviors strictly but fairly:
-    1. Repeated gibberish or nonsensical keyboard smashing.
-    2. Harsh, rude, or aggressive language.
-    3. Profanity or clearly offensive content.
-
-    If clearly inappropriate (repeated profanity/aggression/gibberish), respond:
-    "INAPPROPRIATE: [reason]"
-
-    If minor awkwardness, occasional mistakes, or nervousness, respond simply:
-    "ACCEPTABLE"
+@st.cache_resource
+def setup_metrics():
+    # Streamlit cannot serve extra routes, so /metrics lives on its own port
+    return metrics.serve() if metrics.METRICS_PORT else None
 
-    Be forgiving, human-like, and flexible—only flag clear and serious issues.
+@st.cache_resource
+def setup_sessions():
+    # Turn logs live outside the process, so a reconnect to any worker resumes the interview
+    return setup_session_store()
 
-    Be human-like: allow up to two minor instances before marking responses as inappropriate. 
-    Only flag as inappropriate after clear repeated offenses (3 or more times) or severe disrespect/profanity.
-    """
-    return generate_groq_response(prompt, "technical_agent", temperature=0.1)
+@st.cache_resource
+def setup_retention():
+    # Expire the chunks of abandoned sessions in the background (vacuuming is left to the CLI)
+    return start_retention(sessions=setup_sessions()) if RETENTION_INTERVAL else None
 
-# -------------------- Initialize Components --------------------
-embedding_model = setup_embeddings()
-collection = setup_chromadb()
+setup_components()
+setup_metrics()
+sessions = setup_sessions()
+setup_retention()
 
 # -------------------- Session State --------------------
 if "user_id" not in st.session_state:
-    st.session_state.user_id = str(uuid.uuid4())
+    # ?session= names the turn log; replaying it restores an interview started on another worker
+    # or before a restart, without repeating any LLM or embedding work
+    session_id = st.query_params.get("session") if sessions is not None else None
+    events = sessions.events(session_id) if session_id else []
+    if events:
+        st.session_state.update(replay(events))
+        if st.session_state.resume_upload and not touch_user(session_id):
+            # The chunks expired (RETENTION_TTL) before the session did: ask for the resume again
+            st.session_state.resume_upload = None
+    st.session_state.user_id = session_id if events else str(uuid.uuid4())
+    if sessions is not None:
+        st.query_params["session"] = st.session_state.user_id
+if "lease" not in st.session_state and sessions is None:
+    # Deletes this session's resume chunks once Streamlit drops the session; resumable
+    # sessions keep them until RETENTION_TTL instead
+    st.session_state.lease = SessionLease(st.session_state.user_id)
 if "interview_active" not in st.session_state:
     st.session_state.interview_active = False
 if "current_step" not in st.session_state:
@@ -377,56 +207,321 @@ if "needs_clarification" not in st.session_state:
     st.session_state.needs_clarification = False
 if "clarification_response" not in st.session_state:
     st.session_state.clarification_response = None
+if "resume_upload" not in st.session_state:
+    st.session_state.resume_upload = None
+if "pending_question" not in st.session_state:
+    st.session_state.pending_question = None
+if "question_plan" not in st.session_state:
+    st.session_state.question_plan = None  # future of a QuestionPlan when QUESTION_PLAN=1
+if "turn" not in st.session_state:
+    st.session_state.turn = None  # the submitted answer while its LLM calls are running
+if "turn_error" not in st.session_state:
+    st.session_state.turn_error = None  # shown when a turn's LLM calls failed
+if "context" not in st.session_state:
+    st.session_state.context = InterviewContext()
+if "retrieval_cache" not in st.session_state:
+    st.session_state.retrieval_cache = {}
+if "report_cache" not in st.session_state:
+    # Reports are the largest thing a finished session holds, so they stay in the store when there is one
+    st.session_state.report_cache = StoredReports(sessions, st.session_state.user_id) if sessions is not None else {}
+
+# Opt-in profiling of this session's script runs: open the app with ?profile=1
+if st.query_params.get("profile") == "1" and "profiler" not in st.session_state:
+    st.session_state.profiler = metrics.SessionProfiler(st.session_state.user_id)
+if "profiler" in st.session_state:
+    st.session_state.profiler.start()
 
 # -------------------- UI Components --------------------
-def show_message(message, is_question=True):
+def show_message(message, is_question=True, placeholder=None):
     style_class = "question-card" if is_question else "feedback-card"
-    st.markdown(f"""
+    (placeholder or st).markdown(f"""
         <div class="{style_class}">
             <p style="color: #FFFFFF;">{message}</p>
         </div>
     """, unsafe_allow_html=True)
 
-def show_welcome(greeting):
-    st.markdown(f"""
+def show_welcome(greeting, placeholder=None):
+    (placeholder or st).markdown(f"""
         <div class="welcome-card">
             <h3 style="color: #4A90E2; margin-bottom: 1rem;">👋 Welcome to Your Interview Session</h3>
             <p style="color: #FFFFFF;">{greeting}</p>
         </div>
     """, unsafe_allow_html=True)
 
+def show_report_preview(feedback, placeholder):
+    placeholder.markdown(f"""
+        <div class="final-report">
+            <p style="color: #CCCCCC; white-space: pre-wrap;">{feedback}</p>
+        </div>
+    """, unsafe_allow_html=True)
+
+def stream_message(chunks, show):
+    """Render streamed text progressively with `show(text, placeholder=...)` and return the full text"""
+    placeholder = st.empty()
+    text = ""
+    for chunk in chunks:
+        text += chunk
+        show(text, placeholder=placeholder)
+    return text
+
+# -------------------- Interview Flow --------------------
+def record(*event):
+    """Append a state change to this session's turn log (see session_store.replay)"""
+    if sessions is not None:
+        sessions.append(st.session_state.user_id, list(event))
+
+def submit_stream(loop, agent_function, *args):
+    """Run a streaming agent coroutine on the event loop; the returned TokenStream can be rendered as it grows"""
+    tokens = TokenStream()
+    loop.submit(tokens.arun(agent_function, *args, stream=True))
+    return tokens
+
+async def write_greeting(user_id, retrieval_cache, candidate_name, stream=False):
+    resume_data = await aretrieve_resume(user_id, "background experience", retrieval_cache, sections=BACKGROUND_SECTIONS)
+    return await azero_agent_greeting(resume_data, candidate_name, stream=stream)
+
+async def write_question_plan(user_id, retrieval_cache):
+    resume_data = await aretrieve_resume(user_id, "technical skills", retrieval_cache, sections=TECHNICAL_SECTIONS)
+    return await abuild_question_plan(resume_data, get_embedding_model())
+
+async def write_technical_question(user_id, retrieval_cache, history, question_count, plan=None, last_answer="", stream=False):
+    # A ready question plan turns this into a short adaptation call; never wait for one still being written
+    if plan is not None and plan.done() and plan.exception() is None:
+        question = await aplanned_question(plan.result(), question_count, last_answer, get_embedding_model(), stream=stream)
+        if question is not None:
+            return question
+    resume_data = await aretrieve_resume(user_id, "technical skills", retrieval_cache, sections=TECHNICAL_SECTIONS)
+    return await atechnical_agent_question(resume_data, history, question_count, stream=stream)
+
+async def write_clarification(user_id, retrieval_cache, question, answer, stream=False):
+    resume_data = await aretrieve_resume(user_id, question, retrieval_cache)
+    return await aclarification_agent_response(question, answer, resume_data, stream=stream)
+
+def schedule_next_question(loop, responses, context):
+    """Start generating the question that follows `responses`; None when the interview is over"""
+    user_id, retrieval_cache = st.session_state.user_id, st.session_state.retrieval_cache
+    plan = st.session_state.question_plan
+    if st.session_state.interview_phase == "greeting":
+        return submit_stream(loop, write_technical_question, user_id, retrieval_cache, "", 0, plan)
+    if len(responses) >= MAX_TECHNICAL_QUESTIONS + 1:  # technical questions + greeting
+        return None
+    return submit_stream(
+        loop, write_technical_question, user_id, retrieval_cache,
+        context.render(), len(responses) - 1, plan, responses[-1]["answer"]
+    )
+
+def submit_turn(answer):
+    """Start every LLM call an answer needs and return at once; show_turn_progress() collects them"""
+    loop = setup_event_loop()
+    current_question = st.session_state.questions[st.session_state.current_step]
+    answering_clarification = st.session_state.needs_clarification
+    if answering_clarification:
+        responses = st.session_state.responses
+        context = st.session_state.context
+    else:
+        responses = st.session_state.responses + [{
+            'question': current_question,
+            'answer': answer
+        }]
+        context = st.session_state.context.extended(current_question, answer)
+
+    # Moderation, the follow-up check and the next question are independent LLM calls,
+    # so they run side by side on the event loop.
+    clarification = None
+    if not answering_clarification:
+        clarification = submit_stream(
+            loop, write_clarification, st.session_state.user_id, st.session_state.retrieval_cache, current_question, answer
+        )
+    st.session_state.turn = {
+        "answer": answer,
+        "answering_clarification": answering_clarification,
+        "responses": responses,
+        "context": context,
+        "moderation": loop.submit(astrict_agent_monitor(answer)),
+        "clarification": clarification,
+        # A question speculated earlier (during the greeting or before a clarification round) is still valid
+        "next_question": st.session_state.pending_question or schedule_next_question(loop, responses, context),
+    }
+    st.session_state.pending_question = None
+
+def visible_stream(turn):
+    """The stream shown for a turn: the clarification while it may be needed, then the next question"""
+    clarification = turn["clarification"]
+    if clarification is not None:
+        _, done = clarification.snapshot()
+        if not done or clarification.result():
+            return clarification
+    return turn["next_question"]
+
+def advance_interview(next_question):
+    """Move on to `next_question` (its text), or end the interview when it is None"""
+    if next_question is None:
+        st.session_state.interview_active = False
+        record("end", None)
+        return
+    if st.session_state.interview_phase == "greeting":
+        st.session_state.interview_phase = "technical"
+    st.session_state.questions.append(next_question)
+    record("question", next_question)
+    st.session_state.current_step += 1
+
+def cancel_turn(turn):
+    for stream in (turn["clarification"], turn["next_question"]):
+        if stream:
+            stream.cancel()
+
+def finish_turn(turn):
+    """Apply a completed turn to the session; returns the reason if the answer was rejected.
+
+    Every result is read before any state changes, so a failed call leaves the session as it was.
+    """
+    appropriateness_check = turn["moderation"].result()
+    if "INAPPROPRIATE:" in appropriateness_check:
+        cancel_turn(turn)
+        st.session_state.turn = None
+        st.session_state.interview_active = False
+        reason = appropriateness_check.split("INAPPROPRIATE:")[1].strip()
+        record("end", reason)
+        return reason
+    clarification_text = None if turn["answering_clarification"] else turn["clarification"].result()
+    # While a clarification is pending the next question is kept for later, not waited for
+    next_question = None
+    if not clarification_text and turn["next_question"] is not None:
+        next_question = turn["next_question"].result()
+    st.session_state.turn = None
+
+    # Handle clarification request if needed
+    if turn["answering_clarification"]:
+        st.session_state.needs_clarification = False
+        st.session_state.responses[-1]['clarification'] = st.session_state.clarification_response
+        st.session_state.responses[-1]['clarification_response'] = turn["answer"]
+        st.session_state.clarification_response = None
+        record("clarified", turn["answer"])
+        advance_interview(next_question)
+    else:
+        # Store the response
+        st.session_state.responses = turn["responses"]
+        st.session_state.context = turn["context"]
+        record("answer", turn["answer"])
+
+        # Check if clarification is needed
+        if clarification_text:
+            st.session_state.needs_clarification = True
+            st.session_state.clarification_response = clarification_text
+            st.session_state.pending_question = turn["next_question"]
+            record("clarify", clarification_text)
+        else:
+            # No clarification needed, proceed to next question
+            advance_interview(next_question)
+    return None
+
+@st.fragment(run_every=UI_POLL_INTERVAL)
+def show_turn_progress():
+    """Poll the running turn and show its text as it arrives; the script never blocks on the LLM.
+
+    Only rendered while a turn is running, so idle sessions are not polled.
+    """
+    turn = st.session_state.turn
+    if turn is None:
+        return
+    if not turn["moderation"].done():
+        st.caption("⏳ Processing your response...")
+        return
+    try:
+        if "INAPPROPRIATE:" not in turn["moderation"].result():
+            stream = visible_stream(turn)
+            if stream is not None:
+                text, done = stream.snapshot()
+                if text:
+                    show_message(text)
+                if not done:
+                    return
+        reason = finish_turn(turn)
+    except Exception as e:
+        # Nothing was applied: drop the turn so the candidate can submit the answer again
+        logger.exception("turn failed")
+        cancel_turn(turn)
+        st.session_state.turn = None
+        st.session_state.turn_error = f"Sorry, we could not process your response ({e.__class__.__name__}). Please submit it again."
+        st.rerun()
+    if reason is not None:
+        # End the interview with a popup
+        st.error(f"⚠️ Interview Terminated")
+
+        st.markdown(f"""
+        <div style="background:#FF3B30; padding:1.5rem; border-radius:10px; color:white; text-align:center;">
+            <h3 style="margin:0 0 1rem 0;">Interview Terminated</h3>
+            <p style="margin:0;">{reason}</p>
+            <p style="margin:1rem 0 0 0; font-size:0.9rem;">Professional communication is essential in interview settings. 
+            Please restart the interview and maintain appropriate professional discourse.</p>
+        </div>
+        """, unsafe_allow_html=True)
+    st.rerun()
+
 # -------------------- Main Application Flow --------------------
 st.title("💼 AI-Powered Interview Coach")
 st.markdown("Upload your resume for a personalized mock interview session")
 
 # Resume Upload Section
 with st.expander("📄 Upload Your Resume", expanded=True):
+    resume_missing = st.session_state.resume_upload is None and (st.session_state.interview_active or st.session_state.responses)
+    if resume_missing:
+        st.warning("Your resume is no longer stored. Please upload it again to continue this interview.")
     uploaded_file = st.file_uploader("Choose PDF or TXT file", type=["pdf", "txt"])
-    if uploaded_file and not st.session_state.interview_active:
-        with st.spinner("Processing your resume..."):
-            resume_text = extract_text_from_resume(uploaded_file)
-            st.session_state.candidate_name = store_resume(resume_text, st.session_state.user_id)
+    if uploaded_file and (not st.session_state.interview_active or resume_missing):
+        # Only parse and ingest when a different file is uploaded, not on every rerun
+        upload_key = (uploaded_file.name, uploaded_file.size)
+        if st.session_state.resume_upload != upload_key:
+            with st.spinner("Processing your resume..."):
+                try:
+                    st.session_state.candidate_name = ingest_resume(uploaded_file, st.session_state.user_id)
+                    st.session_state.retrieval_cache = {}
+                    st.session_state.resume_upload = upload_key
+                    record("resume", st.session_state.candidate_name, list(upload_key))
+                    if QUESTION_PLAN_ENABLED:
+                        # Written in the background while the candidate gets ready to start
+                        st.session_state.question_plan = setup_event_loop().submit(
+                            write_question_plan(st.session_state.user_id, st.session_state.retrieval_cache)
+                        )
+                except ResumeTooLarge as e:
+                    st.error(str(e))
+        if st.session_state.resume_upload == upload_key:
             st.success("Resume analysis completed!")
 
 # Interview Control
-if not st.session_state.interview_active and uploaded_file:
+if not st.session_state.interview_active and uploaded_file and st.session_state.resume_upload:
     if st.button("🚀 Start Interview Session"):
         st.session_state.interview_active = True
         st.session_state.current_step = 0
         st.session_state.interview_phase = "greeting"
         st.session_state.questions = []
         st.session_state.responses = []
+        st.session_state.context = InterviewContext()
+        st.session_state.pending_question = None
+        st.session_state.turn = None
+        st.session_state.turn_error = None
+        record("start")
+        plan = st.session_state.question_plan
+        if plan is not None and plan.done() and plan.exception() is None:
+            plan.result().reset()  # a new interview may ask the planned questions again
         st.rerun()
 
 # Interview Session
-if st.session_state.interview_active:
+if st.session_state.interview_active and st.session_state.resume_upload:
     # Greeting Phase
     if st.session_state.interview_phase == "greeting" and not st.session_state.questions:
+        loop = setup_event_loop()
+        if st.session_state.pending_question is None:
+            # The first technical question does not depend on the greeting answer, so it is
+            # written in the background while the candidate reads the greeting and types
+            st.session_state.pending_question = schedule_next_question(loop, [], st.session_state.context)
         with st.spinner("Preparing your interview..."):
-            resume_data = retrieve_resume(st.session_state.user_id, "background experience")
-            greeting = zero_agent_greeting(resume_data, st.session_state.candidate_name)
+            greeting = stream_message(
+                submit_stream(loop, write_greeting, st.session_state.user_id, st.session_state.retrieval_cache, st.session_state.candidate_name),
+                show_welcome
+            )
             st.session_state.questions.append(greeting)
-            show_welcome(greeting)
+            record("question", greeting)
     
     # Show current message/question
     if st.session_state.needs_clarification and st.session_state.clarification_response:
@@ -436,165 +531,46 @@ if st.session_state.interview_active:
         if st.session_state.current_step > 0 or st.session_state.interview_phase != "greeting":
             show_message(current_question, is_question=True)
     
+    if st.session_state.turn_error:
+        st.error(st.session_state.turn_error)
+
     # Answer input
+    turn_running = st.session_state.turn is not None
     answer = st.text_area(
         "Your Response:", 
         key=f"answer_{st.session_state.current_step}_{st.session_state.needs_clarification}",
         height=150,
-        placeholder="Type your response here..."
+        placeholder="Type your response here...",
+        disabled=turn_running
     )
     
-    if st.button("Submit Response"):
+    if st.button("Submit Response", disabled=turn_running):
         if answer.strip():
-            with st.spinner("Processing your response..."):
-                appropriateness_check = strict_agent_monitor(answer)
-                if "INAPPROPRIATE:" in appropriateness_check:
-                    reason = appropriateness_check.split("INAPPROPRIATE:")[1].strip()
-                    
-                    # End the interview with a popup
-                    st.session_state.interview_active = False
-                    st.error(f"⚠️ Interview Terminated")
-                    
-                    st.markdown(f"""
-                    <div style="background:#FF3B30; padding:1.5rem; border-radius:10px; color:white; text-align:center;">
-                        <h3 style="margin:0 0 1rem 0;">Interview Terminated</h3>
-                        <p style="margin:0;">{reason}</p>
-                        <p style="margin:1rem 0 0 0; font-size:0.9rem;">Professional communication is essential in interview settings. 
-                        Please restart the interview and maintain appropriate professional discourse.</p>
-                    </div>
-                    """, unsafe_allow_html=True)
-                    
-                    # No further processing needed
-                    st.rerun()
-                
-                current_question = st.session_state.questions[st.session_state.current_step]
-                
-                # Handle clarification request if needed
-                if st.session_state.needs_clarification:
-                    st.session_state.needs_clarification = False
-                    st.session_state.responses[-1]['clarification'] = st.session_state.clarification_response
-                    st.session_state.responses[-1]['clarification_response'] = answer
-                    st.session_state.clarification_response = None
-                    
-                    # Move to next question
-                    if st.session_state.interview_phase == "greeting":
-                        st.session_state.interview_phase = "technical"
-                        resume_data = retrieve_resume(st.session_state.user_id, "technical skills")
-                        new_question = technical_agent_question(resume_data, "", 0)
-                        st.session_state.questions.append(new_question)
-                        st.session_state.current_step += 1
-                    elif len(st.session_state.responses) >= 6:  # Limit to 5 technical questions + greeting
-                        st.session_state.interview_active = False
-                    else:
-                        interview_history = "\n".join([
-                            f"Q: {item['question']}\nA: {item['answer']}" 
-                            for item in st.session_state.responses
-                        ])
-                        resume_data = retrieve_resume(st.session_state.user_id, "technical skills")
-                        new_question = technical_agent_question(
-                            resume_data, 
-                            interview_history, 
-                            len(st.session_state.responses) - 1
-                        )
-                        st.session_state.questions.append(new_question)
-                        st.session_state.current_step += 1
-                else:
-                    # Store the response
-                    st.session_state.responses.append({
-                        'question': current_question,
-                        'answer': answer
-                    })
-                    
-                    # Check if clarification is needed
-                    resume_data = retrieve_resume(st.session_state.user_id, current_question)
-                    clarification = clarification_agent_response(
-                        current_question, 
-                        answer,
-                        resume_data
-                    )
-                    
-                    if clarification:
-                        st.session_state.needs_clarification = True
-                        st.session_state.clarification_response = clarification
-                    else:
-                        # No clarification needed, proceed to next question
-                        if st.session_state.interview_phase == "greeting":
-                            st.session_state.interview_phase = "technical"
-                            resume_data = retrieve_resume(st.session_state.user_id, "technical skills")
-                            new_question = technical_agent_question(resume_data, "", 0)
-                            st.session_state.questions.append(new_question)
-                            st.session_state.current_step += 1
-                        elif len(st.session_state.responses) >= 6:  # Limit to 5 technical questions + greeting
-                            st.session_state.interview_active = False
-                        else:
-                            interview_history = "\n".join([
-                                f"Q: {item['question']}\nA: {item['answer']}" 
-                                for item in st.session_state.responses
-                            ])
-                            resume_data = retrieve_resume(st.session_state.user_id, "technical skills")
-                            new_question = technical_agent_question(
-                                resume_data, 
-                                interview_history, 
-                                len(st.session_state.responses) - 1
-                            )
-                            st.session_state.questions.append(new_question)
-                            st.session_state.current_step += 1
-                
-                st.rerun()
+            st.session_state.turn_error = None
+            submit_turn(answer)
+            st.rerun()
+
+    if turn_running:
+        show_turn_progress()
 
 # Final Report
-if not st.session_state.interview_active and st.session_state.responses:
+if not st.session_state.interview_active and st.session_state.responses and st.session_state.resume_upload:
     st.balloons()
     st.markdown("---")
     st.subheader("📊 Interview Feedback Report")
     
     with st.spinner("Generating comprehensive feedback..."):
-        resume_data = retrieve_resume(st.session_state.user_id, "complete profile")
-        feedback = report_agent_feedback(st.session_state.responses, resume_data)
-        
-        # Process the feedback to extract correct/improve sections
-        processed_feedback = []
-        for qa_index, qa in enumerate(st.session_state.responses):
-            question_section = f"Q{qa_index+1}: {qa['question']}"
-            answer_section = f"Answer: {qa['answer']}"
-            
-            # Find analysis for this question
-            correct_parts = re.findall(r"CORRECT:(.*?)(?=IMPROVE:|$)", feedback, re.DOTALL)
-            improve_parts = re.findall(r"IMPROVE:(.*?)(?=CORRECT:|$)", feedback, re.DOTALL)
-
-            correct_html = ""
-            if qa_index < len(correct_parts) and correct_parts[qa_index].strip():
-                correct_text = strip_markdown(correct_parts[qa_index].strip())
-                correct_html = f"""
-                <div class="correct-answer">
-                    <h4 style="color: #4CD964; margin:0;">✅ Strong Points</h4>
-                    <p style="color: #CCCCCC; margin-top:0.5rem;">{correct_text}</p>
-                </div>
-                """
-                
-            improve_html = ""
-            if qa_index < len(improve_parts) and improve_parts[qa_index].strip():
-                improve_html = f"""
-                <div class="wrong-answer">
-                    <h4 style="color: #FF3B30; margin:0;">💡 Areas to Develop</h4>
-                    <p style="color: #CCCCCC; margin-top:0.5rem;">{improve_parts[qa_index].strip()}</p>
-                </div>
-                """
-                
-            processed_feedback.append({
-                "question": question_section,
-                "answer": answer_section,
-                "correct_html": correct_html,
-                "improve_html": improve_html
-            })
-
-        # Extract recommended topics
-        topic_match = re.search(r"RECOMMENDED TOPICS:(.*?)(?=$)", feedback, re.DOTALL)
-        topics = []
-        if topic_match:
-            topics_text = topic_match.group(1).strip()
-            topics = [topic.strip() for topic in re.split(r'\d+\.\s+', topics_text) if topic.strip()]
-            topics = [topic for topic in topics if len(topic) > 3]  # Filter out short/empty topics
+        resume_data = retrieve_resume(st.session_state.user_id, "complete profile", st.session_state.retrieval_cache)
+        preview = st.empty()
+        report = get_report(
+            st.session_state.responses,
+            resume_data,
+            cache=st.session_state.report_cache,
+            render=lambda feedback: show_report_preview(feedback, preview)
+        )
+        preview.empty()
+        processed_feedback = report.processed_feedback
+        topics = report.topics
     
     with st.container():
         st.markdown("""
@@ -660,10 +636,15 @@ if not st.session_state.interview_active and st.session_state.responses:
         st.session_state.responses = []
         st.session_state.needs_clarification = False
         st.session_state.clarification_response = None
+        st.session_state.context = InterviewContext()
+        st.session_state.pending_question = None
+        st.session_state.turn = None
+        st.session_state.turn_error = None
+        record("reset")
         st.rerun()
 
 st.markdown("---")
 st.markdown("<div style='text-align: center; color: #888888; margin: 2rem 0;'>Structured practice interviews to enhance your technical communication skills</div>", unsafe_allow_html=True)
 
-
-
+if "profiler" in st.session_state:
+    st.session_state.profiler.stop()
@@ -0,0 +1,328 @@
+"""Headless batch interviews: run every resume in a directory through the interview and write the reports.
+
+    python batch.py resumes/ --out reports.jsonl --concurrency 8 --workers 4
+    python batch.py resumes/ --out reports.jsonl --synthetic
+    python batch.py resumes/ --out smoke.jsonl --fake-llm --fake-embeddings
+
+Extraction and embedding run in a process pool; the interviews share one asyncio loop with
+at most --concurrency in flight. Each finished resume is appended to the JSONL output right
+away, and a rerun with the same --out skips resumes already reported, so an interrupted batch
+picks up where it stopped. Answers come from a scripted list (--answers, a JSON list of
+strings) or, with --synthetic, are written by the LLM in the candidate's voice.
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import extraction
+import llm
+import metrics
+import interview_core as core
+from interview_context import InterviewContext
+from offline import CLARIFICATION_ANSWER, SCRIPTED_ANSWERS, HashEmbeddings
+from prompts import Section, build_prompt
+
+logger = logging.getLogger(__name__)
+
+# -------------------- Resumes --------------------
+def find_resumes(directory):
+    """PDF and TXT files under `directory`, in a stable order"""
+    paths = []
+    for root, _, names in os.walk(directory):
+        for name in names:
+            if os.path.splitext(name)[1].lower() in core.ResumeFile.TYPES:
+                paths.append(os.path.join(root, name))
+    return sorted(paths)
+
+def file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class StagedCollection:
+    """Collection stand-in for pool workers: keeps the rows store_resume writes for the parent to add"""
+
+    def __init__(self):
+        self.rows = {"ids": [], "embeddings": [], "metadatas": []}
+
+    def get(self, **kwargs):
+        return {"ids": [], "embeddings": [], "metadatas": []}
+
+    def delete(self, **kwargs):
+        pass
+
+    def add(self, ids, embeddings, metadatas):
+        self.rows["ids"].extend(ids)
+        self.rows["embeddings"].extend(list(embedding) for embedding in embeddings)
+        self.rows["metadatas"].extend(metadatas)
+
+# -------------------- Pool Workers --------------------
+def init_worker(fake_embeddings):
+    extraction.EXTRACT_WORKERS = 1  # the batch pool already spreads resumes over the cores
+    core.use_components(embeddings=HashEmbeddings() if fake_embeddings else core.setup_embeddings())
+
+def prepare_resume(path, user_id):
+    """Worker: extract, chunk and embed one resume; returns its rows for the parent to store"""
+    staged = StagedCollection()
+    core.use_components(resume_collection=staged)
+    start = time.perf_counter()
+    text = core.extract_text_from_resume(core.ResumeFile(path))
+    extracted = time.perf_counter()
+    candidate_name = core.store_resume(text, user_id)
+    return {
+        "candidate_name": candidate_name,
+        "rows": staged.rows,
+        "extract_s": extracted - start,
+        "embed_s": time.perf_counter() - extracted,
+    }
+
+def add_rows(collection, rows):
+    for start in range(0, len(rows["ids"]), core.INGEST_BATCH):
+        collection.add(
+            ids=rows["ids"][start:start + core.INGEST_BATCH],
+            embeddings=rows["embeddings"][start:start + core.INGEST_BATCH],
+            metadatas=rows["metadatas"][start:start + core.INGEST_BATCH]
+        )
+
+# -------------------- Answers --------------------
+class ScriptedAnswers:
+    """The same answers for every candidate, in order"""
+
+    def __init__(self, answers=None, clarification=CLARIFICATION_ANSWER):
+        self.answers = list(answers or SCRIPTED_ANSWERS)
+        self.clarification = clarification
+
+    async def answer(self, user_id, question, cache, turn):
+        return self.answers[turn % len(self.answers)]
+
+    async def clarify(self, user_id, question, cache, turn):
+        return self.clarification
+
+
+def candidate_prompt(question, resume_data):
+    template = """
+    Resume Data: {resume_data}
+
+    Interview Question: {question}
+
+    Answer this question as the candidate described in the resume would, in 2-4 sentences of
+    plain text, drawing on the experience the resume lists. Respond with ONLY the answer.
+    """
+    return build_prompt(
+        "candidate_agent", template,
+        Section("question", question, priority=1, share=0.25),
+        Section("resume_data", resume_data)
+    )
+
+
+class SyntheticAnswers:
+    """Answers written by the LLM from each candidate's own resume"""
+
+    async def answer(self, user_id, question, cache, turn):
+        resume_data = await core.aretrieve_resume(user_id, question, cache)
+        return await llm.agenerate_groq_response(
+            candidate_prompt(question, resume_data), "candidate_agent", temperature=0.8, max_tokens=200
+        )
+
+    clarify = answer
+
+# -------------------- Interview --------------------
+async def run_interview(user_id, candidate_name, answers, questions=5):
+    """One interview over already-stored chunks; returns (responses, termination reason or None)"""
+    cache = {}
+    resume_data = await core.aretrieve_resume(user_id, "background experience", cache, sections=core.BACKGROUND_SECTIONS)
+    question = await core.azero_agent_greeting(resume_data, candidate_name)
+    responses = []
+    context = InterviewContext()
+    while question is not None:
+        answer = await answers.answer(user_id, question, cache, len(responses))
+        responses.append({"question": question, "answer": answer})
+        context = context.extended(question, answer)
+        resume_data = await core.aretrieve_resume(user_id, question, cache)
+        verdict, follow_up = await asyncio.gather(
+            core.astrict_agent_monitor(answer),
+            core.aclarification_agent_response(question, answer, resume_data)
+        )
+        if "INAPPROPRIATE:" in verdict:
+            return responses, verdict.split("INAPPROPRIATE:")[-1].strip()
+        if follow_up:
+            responses[-1]["clarification"] = follow_up
+            responses[-1]["clarification_response"] = await answers.clarify(user_id, follow_up, cache, len(responses) - 1)
+        question = None
+        if len(responses) < questions + 1:  # technical questions + greeting
+            resume_data = await core.aretrieve_resume(user_id, "technical skills", cache, sections=core.TECHNICAL_SECTIONS)
+            question = await core.atechnical_agent_question(resume_data, context.render(), len(responses) - 1)
+    return responses, None
+
+# -------------------- Checkpoint --------------------
+def repair_tail(path):
+    """Drop a last line cut short by a crash, so new records start on a line of their own"""
+    if not os.path.exists(path):
+        return
+    with open(path, "rb+") as f:
+        data = f.read()
+        if data and not data.endswith(b"\n"):
+            f.truncate(data.rfind(b"\n") + 1)
+
+def completed_resumes(path):
+    """(resume, sha256) of every record in `path` that need not run again; failed runs are retried"""
+    done = set()
+    if not os.path.exists(path):
+        return done
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if record.get("status") != "error":
+                done.add((record["resume"], record["sha256"]))
+    return done
+
+
+class ReportWriter:
+    """Appends one JSON line per resume, flushed to disk before the next one is reported"""
+
+    def __init__(self, path):
+        repair_tail(path)
+        self.file = open(path, "a", encoding="utf-8")
+
+    def write(self, record):
+        self.file.write(json.dumps(record) + "\n")
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    def close(self):
+        self.file.close()
+
+# -------------------- Batch --------------------
+async def run_jobs(jobs, pool, writer, answers, questions, concurrency, workers):
+    loop = asyncio.get_running_loop()
+    collection = core.get_collection()
+    interviews = asyncio.Semaphore(concurrency)
+    # Prepared resumes wait for an interview slot; this bounds how many sit in memory
+    admitted = asyncio.Semaphore(concurrency + workers)
+    counts = {"ok": 0, "terminated": 0, "error": 0}
+
+    async def one(path, resume, sha256):
+        # Copies of one resume run side by side, so the id must differ per path as well as per content
+        user_id = "batch-" + hashlib.sha256(f"{resume}\0{sha256}".encode("utf-8")).hexdigest()[:16]
+        record = {"resume": resume, "sha256": sha256}
+        async with admitted:
+            start = time.perf_counter()
+            try:
+                prepared = await loop.run_in_executor(pool, prepare_resume, path, user_id)
+                await asyncio.to_thread(add_rows, collection, prepared["rows"])
+                ingested = time.perf_counter()
+                async with interviews:
+                    responses, termination = await run_interview(user_id, prepared["candidate_name"], answers, questions)
+                    resume_data = await core.aretrieve_resume(user_id, "complete profile")
+                    report = await asyncio.to_thread(core.build_report, responses, resume_data)
+                record.update({
+                    "status": "terminated" if termination else "ok",
+                    "candidate_name": prepared["candidate_name"],
+                    "termination": termination,
+                    "responses": responses,
+                    "report": report.to_dict(),
+                    "timings": {
+                        "extract_s": prepared["extract_s"],
+                        "embed_s": prepared["embed_s"],
+                        "interview_s": time.perf_counter() - ingested,
+                    },
+                })
+            except Exception as e:
+                logger.exception("batch interview failed for %s", resume)
+                record.update({"status": "error", "error": repr(e)})
+            finally:
+                await asyncio.to_thread(core.delete_user, user_id)
+        counts[record["status"]] += 1
+        metrics.increment("batch_resumes_total", status=record["status"])
+        writer.write(record)  # only this loop writes, so records never interleave
+
+    await asyncio.gather(*(one(*job) for job in jobs))
+    return counts
+
+def run_batch(directory, out_path, answers=None, questions=5, concurrency=8, workers=None, fake_embeddings=False):
+    """Interview every resume under `directory` not yet reported in `out_path`; returns a summary"""
+    answers = answers or ScriptedAnswers()
+    workers = max(workers or extraction.EXTRACT_WORKERS, 1)
+    done = completed_resumes(out_path)
+    paths = find_resumes(directory)
+    jobs = []
+    for path in paths:
+        resume, sha256 = os.path.relpath(path, directory), file_hash(path)
+        if (resume, sha256) not in done:
+            jobs.append((path, resume, sha256))
+    skipped = len(paths) - len(jobs)
+
+    writer = ReportWriter(out_path)
+    start = time.perf_counter()
+    try:
+        with ProcessPoolExecutor(
+            workers, mp_context=multiprocessing.get_context("spawn"),
+            initializer=init_worker, initargs=(fake_embeddings,)
+        ) as pool:
+            counts = asyncio.run(run_jobs(jobs, pool, writer, answers, questions, concurrency, workers)) if jobs else {}
+    finally:
+        writer.close()
+    elapsed = time.perf_counter() - start
+    finished = sum(counts.values())
+    return {
+        **counts,
+        "skipped": skipped,
+        "elapsed_s": elapsed,
+        "resumes_per_min": finished / elapsed * 60 if elapsed and finished else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("directory", help="directory of PDF/TXT resumes (searched recursively)")
+    parser.add_argument("--out", default="batch_reports.jsonl", help="JSONL output, also the checkpoint")
+    parser.add_argument("--answers", help="JSON list of scripted answers (default: the benchmark's)")
+    parser.add_argument("--synthetic", action="store_true", help="have the LLM answer from each resume")
+    parser.add_argument("--questions", type=int, default=5, help="technical questions per interview")
+    parser.add_argument("--concurrency", type=int, default=8, help="interviews in flight at once")
+    parser.add_argument("--workers", type=int, default=extraction.EXTRACT_WORKERS, help="extraction/embedding processes")
+    parser.add_argument("--chroma-path", help="Chroma directory (default: a throwaway temp dir)")
+    parser.add_argument("--fake-llm", action="store_true", help="use the deterministic fake LLM (pipeline smoke test)")
+    parser.add_argument("--fake-embeddings", action="store_true", help="use hashed bag-of-words vectors instead of MiniLM")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO"))
+    answers = SyntheticAnswers() if args.synthetic else None
+    if args.answers:
+        with open(args.answers, encoding="utf-8") as f:
+            answers = ScriptedAnswers(json.load(f))
+    if args.fake_llm:
+        llm.set_backend(llm.FakeBackend())
+    workdir = tempfile.mkdtemp(prefix="interview-batch-")
+    try:
+        core.use_components(
+            embeddings=HashEmbeddings() if args.fake_embeddings else None,
+            resume_collection=core.setup_chromadb(args.chroma_path or os.path.join(workdir, "chroma_db"))
+        )
+        summary = run_batch(
+            args.directory, args.out, answers, args.questions, args.concurrency, args.workers, args.fake_embeddings
+        )
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    print(
+        f"{summary.get('ok', 0)} reported, {summary.get('terminated', 0)} terminated, {summary.get('error', 0)} failed, "
+        f"{summary['skipped']} already done in {summary['elapsed_s']:.1f}s ({summary['resumes_per_min']:.1f} resumes/min)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+"""Offline benchmark: replay scripted interviews through the core pipeline against a fake LLM.
+
+    python benchmark.py --interviews 5 --latency 0.4 --token-latency 0.01
+    python benchmark.py --resume resumes/jane.pdf --fake-embeddings --json results.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import resource
+import shutil
+import tempfile
+import time
+import tracemalloc
+import uuid
+from collections import defaultdict
+
+import llm
+import metrics
+import interview_core as core
+from interview_context import InterviewContext
+from offline import CLARIFICATION_ANSWER, SAMPLE_RESUME, SCRIPTED_ANSWERS, HashEmbeddings, StageTimer
+from prompts import count_tokens
+from question_plan import abuild_question_plan, aplanned_question
+
+# -------------------- Scripted Interview --------------------
+def run_interview(resume_file, timer, answers=SCRIPTED_ANSWERS, max_responses=6, question_plan=False):
+    """Replay one interview the way app.py drives it and return the built report"""
+    user_id = str(uuid.uuid4())
+    retrieval_cache = {}
+
+    with timer.stage("ingest_resume"):
+        candidate_name = core.ingest_resume(resume_file, user_id)
+    plan = None
+    if question_plan:
+        # The app writes the plan in the background right after ingest, off the turn path
+        with timer.stage("question_plan"):
+            resume_data = core.retrieve_resume(user_id, "technical skills", retrieval_cache, sections=core.TECHNICAL_SECTIONS)
+            plan = asyncio.run(abuild_question_plan(resume_data, core.get_embedding_model()))
+
+    with timer.stage("retrieve_resume"):
+        resume_data = core.retrieve_resume(user_id, "background experience", retrieval_cache, sections=core.BACKGROUND_SECTIONS)
+    with timer.stage("zero_agent_greeting"):
+        questions = [core.zero_agent_greeting(resume_data, candidate_name)]
+
+    responses = []
+    context = InterviewContext()
+    answers = iter(answers)
+    while len(responses) < max_responses:
+        question = questions[-1]
+        answer = next(answers, "I would need to think about that more carefully.")
+        with timer.stage("strict_agent_monitor"):
+            verdict = core.strict_agent_monitor(answer)
+        if "INAPPROPRIATE:" in verdict:
+            break
+        responses.append({"question": question, "answer": answer})
+        context = context.extended(question, answer)
+
+        with timer.stage("retrieve_resume"):
+            resume_data = core.retrieve_resume(user_id, question, retrieval_cache)
+        with timer.stage("clarification_agent_response"):
+            clarification = core.clarification_agent_response(question, answer, resume_data)
+        if clarification:
+            with timer.stage("strict_agent_monitor"):
+                core.strict_agent_monitor(CLARIFICATION_ANSWER)
+            responses[-1]["clarification"] = clarification
+            responses[-1]["clarification_response"] = CLARIFICATION_ANSWER
+
+        if len(responses) >= max_responses:
+            break
+        history = "" if len(responses) == 1 else context.render()
+        with timer.stage("retrieve_resume"):
+            resume_data = core.retrieve_resume(user_id, "technical skills", retrieval_cache, sections=core.TECHNICAL_SECTIONS)
+        with timer.stage("technical_agent_question"):
+            question = None
+            if plan is not None:
+                last_answer = "" if len(responses) == 1 else answer  # the app plans the first question during the greeting
+                question = asyncio.run(aplanned_question(plan, len(responses) - 1, last_answer, core.get_embedding_model()))
+            questions.append(question or core.technical_agent_question(resume_data, history, len(responses) - 1))
+
+    with timer.stage("retrieve_resume"):
+        resume_data = core.retrieve_resume(user_id, "complete profile", retrieval_cache)
+    with timer.stage("report"):
+        report = core.build_report(responses, resume_data)
+    return report
+
+
+def run_benchmark(resume_paths, interviews, latency, token_latency, fake_embeddings, chroma_path, questions=5, question_plan=False):
+    backend = llm.FakeBackend(latency=latency, token_latency=token_latency)
+    previous_backend = llm.set_backend(backend)
+    core.use_components(
+        embeddings=HashEmbeddings() if fake_embeddings else core.setup_embeddings(),
+        resume_collection=core.setup_chromadb(chroma_path)
+    )
+    metrics.reset()
+    metrics.enable()
+    timer = StageTimer()
+    files = [core.ResumeFile(path) for path in resume_paths]
+
+    tracemalloc.start()
+    started = time.perf_counter()
+    try:
+        for i in range(interviews):
+            with timer.stage("interview"):
+                run_interview(files[i % len(files)], timer, max_responses=questions + 1, question_plan=question_plan)
+    finally:
+        elapsed = time.perf_counter() - started
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        llm.set_backend(previous_backend)
+
+    agent_names = {prompt: name for name, prompt in llm.SYSTEM_PROMPTS.items()}
+    calls_by_agent = defaultdict(int)
+    for call in backend.calls:
+        calls_by_agent[agent_names.get(call["messages"][0]["content"], "default")] += 1
+    return {
+        "interviews": interviews,
+        "elapsed_s": elapsed,
+        "stages": timer.summary(),
+        "llm_calls": len(backend.calls),
+        "llm_calls_per_interview": len(backend.calls) / max(interviews, 1),
+        "llm_calls_by_agent": dict(calls_by_agent),
+        "prompt_tokens_sent": sum(
+            count_tokens(message["content"]) for call in backend.calls for message in call["messages"]
+        ),
+        "python_heap_peak_mb": peak / 2 ** 20,
+        "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "metrics": metrics.snapshot(),
+    }
+
+
+def print_summary(results):
+    print(f"{results['interviews']} interviews in {results['elapsed_s']:.2f}s")
+    print(f"{'stage':<32}{'count':>7}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}")
+    for name, stats in results["stages"].items():
+        print(f"{name:<32}{stats['count']:>7}{stats['p50_ms']:>10.1f}{stats['p90_ms']:>10.1f}{stats['p99_ms']:>10.1f}")
+    print(f"LLM calls: {results['llm_calls']} ({results['llm_calls_per_interview']:.1f}/interview) {results['llm_calls_by_agent']}")
+    print(f"Prompt tokens sent (est.): {results['prompt_tokens_sent']}")
+    print(f"Python heap peak: {results['python_heap_peak_mb']:.1f} MB, max RSS: {results['max_rss_mb']:.1f} MB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--resume", action="append", help="PDF/TXT resume to replay (repeatable); defaults to a built-in sample")
+    parser.add_argument("--interviews", type=int, default=3)
+    parser.add_argument("--questions", type=int, default=5, help="technical questions per interview")
+    parser.add_argument("--latency", type=float, default=0.0, help="fake LLM time to first token, seconds")
+    parser.add_argument("--token-latency", type=float, default=0.0, help="fake LLM delay per generated token, seconds")
+    parser.add_argument("--fake-embeddings", action="store_true", help="use hashed bag-of-words vectors instead of MiniLM")
+    parser.add_argument("--chroma-path", help="Chroma directory (default: a throwaway temp dir)")
+    parser.add_argument("--question-plan", action="store_true", help="draw technical questions from a pre-written plan")
+    parser.add_argument("--json", dest="json_path", help="also write results to this JSON file")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="interview-bench-")
+    try:
+        resume_paths = args.resume
+        if not resume_paths:
+            resume_paths = [os.path.join(workdir, "sample_resume.txt")]
+            with open(resume_paths[0], "w", encoding="utf-8") as f:
+                f.write(SAMPLE_RESUME)
+        results = run_benchmark(
+            resume_paths, args.interviews, args.latency, args.token_latency,
+            args.fake_embeddings, args.chroma_path or os.path.join(workdir, "chroma_db"), args.questions,
+            args.question_plan
+        )
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print_summary(results)
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+import os
+import re
+from collections import Counter
+
+# -------------------- Configuration --------------------
+CHUNK_MAX_CHARS = int(os.getenv("CHUNK_MAX_CHARS", "480"))  # three retrieved chunks stay near 1.5k chars
+CHUNK_OVERLAP_LINES = int(os.getenv("CHUNK_OVERLAP_LINES", "1"))
+
+SECTION_ALIASES = {
+    "summary": ["summary", "profile", "about", "about me", "objective", "professional summary", "career objective"],
+    "skills": ["skills", "technical skills", "core competencies", "competencies", "technologies", "tech stack", "tools", "expertise", "languages"],
+    "experience": ["experience", "work experience", "professional experience", "employment", "employment history", "work history", "career history"],
+    "projects": ["projects", "personal projects", "selected projects", "key projects", "open source"],
+    "education": ["education", "academic background", "qualifications", "certifications", "courses", "training"],
+}
+SECTION_BY_ALIAS = {alias: section for section, aliases in SECTION_ALIASES.items() for alias in aliases}
+HEADER_SECTION = "header"  # name and contact details before the first heading
+OTHER_SECTION = "other"  # headings we do not recognise (awards, interests, ...)
+
+BOLD_FLAG = 16  # PyMuPDF span flag bit for bold fonts
+
+
+class Line:
+    """One line of resume text, with font information when it came from the PDF layout"""
+    __slots__ = ("text", "size", "bold")
+
+    def __init__(self, text, size=None, bold=False):
+        self.text = text
+        self.size = size
+        self.bold = bold
+
+# -------------------- Line Sources --------------------
+def text_lines(text):
+    return [Line(line) for line in text.splitlines()]
+
+def page_lines(page):
+    """Lines of a PyMuPDF page in reading order, from `page.get_text("dict")`"""
+    lines = []
+    for block in page.get_text("dict")["blocks"]:
+        for line in block.get("lines", []):
+            spans = [span for span in line["spans"] if span["text"].strip()]
+            if not spans:
+                continue
+            lines.append(Line(
+                "".join(span["text"] for span in spans).strip(),
+                size=max(span["size"] for span in spans),
+                bold=all(span["flags"] & BOLD_FLAG for span in spans)
+            ))
+    return lines
+
+def body_font_size(lines):
+    """Most common font size weighted by characters, i.e. the size of ordinary body text"""
+    sizes = Counter()
+    for line in lines:
+        if line.size:
+            sizes[round(line.size, 1)] += len(line.text)
+    return sizes.most_common(1)[0][0] if sizes else None
+
+# -------------------- Section Detection --------------------
+def line_style(line):
+    """What sets a heading apart: font size, weight and casing"""
+    return (round(line.size) if line.size else None, line.bold, line.text.strip().isupper())
+
+def heading_section(line, body_size=None, heading_styles=(), after_blank=True):
+    """Canonical section name if `line` is a heading, else None.
+
+    A heading we do not recognise only opens OTHER_SECTION when it is styled exactly like
+    the recognised headings seen so far (`heading_styles`). Other bold or large lines, such
+    as the candidate's name, job titles and company names, are sub-headings of the current
+    section. Plain-text resumes carry no fonts, so there a heading must also follow a blank line.
+    """
+    text = line.text.strip()
+    words = text.split()
+    if not words or len(words) > 5 or len(text) > 40 or text.endswith((".", ",")):
+        return None
+    key = re.sub(r"[^a-z ]", "", text.lower()).strip()
+    if key in SECTION_BY_ALIAS:
+        return SECTION_BY_ALIAS[key]
+    styled = line.size is not None and body_size and (line.size >= body_size * 1.15 or line.bold)
+    marked = styled or (line.size is None and after_blank and text.isupper() and len(key) > 3)
+    if marked and line_style(line) in heading_styles:
+        return OTHER_SECTION
+    return None
+
+
+class SectionChunker:
+    """Incremental chunker: feed lines, get back chunks that never cross a section boundary.
+
+    Chunks grow line by line up to `max_chars`; when one is full the next starts with the
+    last `overlap_lines` lines of it, so a bullet is never cut in half and context carries
+    over. Each chunk is a dict with `text`, `section` and `chunk` (its running index).
+    """
+
+    def __init__(self, max_chars=None, overlap_lines=None):
+        self.max_chars = max_chars or CHUNK_MAX_CHARS
+        self.overlap_lines = CHUNK_OVERLAP_LINES if overlap_lines is None else overlap_lines
+        self.section = HEADER_SECTION
+        self.heading = None
+        self.heading_styles = set()  # styles of the recognised headings, see heading_section()
+        self._after_blank = True
+        self._lines = []
+        self._size = 0
+        self._count = 0
+        self._heading_flushed = True
+
+    def feed(self, line, body_size=None):
+        """Add one Line; returns the list of chunks completed by it (usually empty)"""
+        if not line.text.strip():
+            self._after_blank = True
+            return []
+        section = heading_section(line, body_size, self.heading_styles, self._after_blank)
+        self._after_blank = False
+        if section:
+            done = self._flush(keep_overlap=False)
+            if section != OTHER_SECTION:
+                self.heading_styles.add(line_style(line))
+            self.section, self.heading = section, line.text.strip()
+            self._heading_flushed = False
+            return done
+        done = []
+        if self._lines and self._size + len(line.text) > self.max_chars:
+            done = self._flush(keep_overlap=True)
+        self._lines.append(line.text.strip())
+        self._size += len(line.text) + 1
+        return done
+
+    def finish(self):
+        return self._flush(keep_overlap=False)
+
+    def _flush(self, keep_overlap):
+        if not self._lines and self._heading_flushed:
+            return []
+        body = "\n".join(self._lines)
+        self._heading_flushed = True  # a heading with nothing under it still gets a chunk of its own
+        chunk = {
+            "text": f"{self.heading}\n{body}".strip() if self.heading else body,
+            "section": self.section,
+            "chunk": self._count,
+        }
+        self._count += 1
+        self._lines = self._lines[-self.overlap_lines:] if keep_overlap and self.overlap_lines else []
+        self._size = sum(len(line) + 1 for line in self._lines)
+        return [chunk]
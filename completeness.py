@@ -0,0 +1,126 @@
+import logging
+import os
+import random
+import time
+
+import metrics
+from moderation import WORD_PATTERN, cosine_similarity
+
+logger = logging.getLogger(__name__)
+
+# -------------------- Configuration --------------------
+# Scores at or above HIGH are complete without asking the LLM, scores below LOW get a local
+# follow-up, everything in between is sent to the follow-up prompt.
+COMPLETENESS_HIGH = float(os.getenv("COMPLETENESS_HIGH", "0.75"))
+COMPLETENESS_LOW = float(os.getenv("COMPLETENESS_LOW", "0.12"))
+# Share of locally decided answers also sent to the LLM, to measure agreement while tuning
+COMPLETENESS_AUDIT_RATE = float(os.getenv("COMPLETENESS_AUDIT_RATE", "0"))
+COMPLETENESS_TARGET_WORDS = int(os.getenv("COMPLETENESS_TARGET_WORDS", "40"))  # length of a full answer
+
+# Question-answer similarity of MiniLM is mapped from [SIMILARITY_FLOOR, SIMILARITY_CEILING] onto [0, 1]
+SIMILARITY_FLOOR = 0.1
+SIMILARITY_CEILING = 0.5
+OFF_TOPIC_SIMILARITY = 0.3  # below this the question is restated rather than expanded on
+WEIGHTS = {"similarity": 0.45, "length": 0.35, "coverage": 0.2}
+
+STOPWORDS = {
+    "about", "also", "and", "are", "been", "can", "could", "did", "does", "for", "from", "had", "has",
+    "have", "how", "into", "its", "more", "not", "our", "over", "than", "that", "the", "their", "them",
+    "then", "there", "these", "they", "this", "used", "using", "was", "were", "what", "when", "where",
+    "which", "while", "who", "why", "will", "with", "would", "you", "your",
+}
+
+EXPAND_FOLLOW_UP = "Could you expand on that with a specific example from your own experience?"
+RESTATE_FOLLOW_UP = "Let's come back to the question: {question}"
+
+# -------------------- Local Score --------------------
+def terms(text):
+    return {word for word in (w.lower() for w in WORD_PATTERN.findall(text)) if len(word) > 2 and word not in STOPWORDS}
+
+def length_score(answer):
+    return min(len(WORD_PATTERN.findall(answer)) / COMPLETENESS_TARGET_WORDS, 1.0)
+
+def coverage_score(question, answer, resume_data):
+    """How much of the resume material the question is about shows up in the answer"""
+    resume_terms = terms(resume_data)
+    answer_terms = terms(answer)
+    topic = resume_terms & terms(question)
+    if topic:
+        return min(len(topic & answer_terms) / min(len(topic), 3), 1.0)  # three topic terms are plenty
+    # A general question: any concrete resume detail counts
+    return min(len(resume_terms & answer_terms) / 3, 1.0)
+
+
+class Assessment:
+    """A local completeness verdict: "complete", "incomplete" or "uncertain" (ask the LLM)"""
+
+    def __init__(self, score, verdict, follow_up=None, similarity=None):
+        self.score = score
+        self.verdict = verdict
+        self.follow_up = follow_up
+        self.similarity = similarity
+        self.audited = False
+
+    @property
+    def decided(self):
+        return self.verdict != "uncertain" and not self.audited
+
+
+class CompletenessScorer:
+    """Decides locally whether an answer needs a follow-up; only uncertain answers reach the LLM"""
+
+    def __init__(self, embedding_model=None):
+        self.embedding_model = embedding_model
+
+    def similarity(self, question, answer):
+        if self.embedding_model is None:
+            return None
+        question_embedding, answer_embedding = self.embedding_model.embed_documents([question, answer])
+        return cosine_similarity(question_embedding, answer_embedding)
+
+    def score(self, question, answer, resume_data):
+        """Weighted completeness in [0, 1] and the raw question-answer similarity"""
+        parts = {
+            "length": length_score(answer),
+            "coverage": coverage_score(question, answer, resume_data),
+        }
+        similarity = self.similarity(question, answer)
+        if similarity is not None:
+            parts["similarity"] = min(max((similarity - SIMILARITY_FLOOR) / (SIMILARITY_CEILING - SIMILARITY_FLOOR), 0.0), 1.0)
+        weight = sum(WEIGHTS[name] for name in parts)
+        return sum(WEIGHTS[name] * value for name, value in parts.items()) / weight, similarity
+
+    def assess(self, question, answer, resume_data):
+        start = time.perf_counter()
+        score, similarity = self.score(question, answer, resume_data)
+        if score >= COMPLETENESS_HIGH:
+            assessment = Assessment(score, "complete", similarity=similarity)
+        elif score < COMPLETENESS_LOW:
+            off_topic = similarity is not None and similarity < OFF_TOPIC_SIMILARITY
+            follow_up = RESTATE_FOLLOW_UP.format(question=question) if off_topic else EXPAND_FOLLOW_UP
+            assessment = Assessment(score, "incomplete", follow_up, similarity)
+        else:
+            assessment = Assessment(score, "uncertain", similarity=similarity)
+        if assessment.verdict != "uncertain" and random.random() < COMPLETENESS_AUDIT_RATE:
+            assessment.audited = True
+
+        tier = "local" if assessment.decided else "audit" if assessment.audited else "remote"
+        metrics.increment("completeness_total", tier=tier, verdict=assessment.verdict)
+        logger.info(
+            "completeness tier=%s score=%.2f latency_ms=%.1f verdict=%s",
+            tier, score, (time.perf_counter() - start) * 1000, assessment.verdict
+        )
+        return assessment
+
+    def record(self, assessment, follow_up):
+        """Compare the LLM's decision (a follow-up question or None) with the local score"""
+        llm = "complete" if follow_up is None else "incomplete"
+        local = assessment.verdict
+        if local == "uncertain":  # which way the score leaned inside the band
+            local = "complete" if assessment.score >= (COMPLETENESS_LOW + COMPLETENESS_HIGH) / 2 else "incomplete"
+        metrics.increment(
+            "completeness_agreement_total",
+            tier="audit" if assessment.audited else "remote", local=local, llm=llm
+        )
+        metrics.observe("completeness_score", assessment.score, llm=llm)
+        return follow_up
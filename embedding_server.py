@@ -0,0 +1,223 @@
+"""Shared embedding service: one MiniLM per host instead of one per Streamlit worker.
+
+    python embedding_server.py --port 8765 --threads 2
+    EMBEDDING_SERVER_URL=http://127.0.0.1:8765 streamlit run app.py
+
+Concurrent requests from all workers are coalesced into micro-batches, so the model runs
+one forward pass per batch instead of one per query.
+"""
+import argparse
+import http.client
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+# -------------------- Configuration --------------------
+EMBEDDING_SERVER_PORT = int(os.getenv("EMBEDDING_SERVER_PORT", "8765"))
+EMBED_BATCH_WINDOW = float(os.getenv("EMBED_BATCH_WINDOW", "0.005"))  # seconds to wait for more requests
+EMBED_MAX_BATCH = int(os.getenv("EMBED_MAX_BATCH", "64"))  # texts per forward pass
+EMBED_CLIENT_TIMEOUT = float(os.getenv("EMBED_CLIENT_TIMEOUT", "30"))
+
+
+class MicroBatcher:
+    """Run embed requests from many threads as a few large batches on one worker thread.
+
+    The worker takes the oldest request, then keeps collecting for up to `window` seconds
+    or until `max_batch` texts are queued, embeds them all at once and hands each caller
+    its slice. A request larger than `max_batch` is never split.
+    """
+
+    def __init__(self, model, window=None, max_batch=None):
+        self.model = model
+        self.window = EMBED_BATCH_WINDOW if window is None else window
+        self.max_batch = max_batch or EMBED_MAX_BATCH
+        self.stats = {"requests": 0, "texts": 0, "batches": 0}
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        threading.Thread(target=self._run, name="embed-batcher", daemon=True).start()
+
+    def queue_depth(self):
+        return self._queue.qsize()
+
+    def submit(self, texts):
+        future = Future()
+        self._queue.put((list(texts), future))
+        metrics.set_gauge("embedding_queue_depth", self._queue.qsize())
+        return future
+
+    def embed(self, texts, timeout=None):
+        return self.submit(texts).result(timeout)
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        size = len(batch[0][0])
+        deadline = time.monotonic() + self.window
+        while size < self.max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            batch.append(item)
+            size += len(item[0])
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            texts = [text for request_texts, _ in batch for text in request_texts]
+            metrics.set_gauge("embedding_queue_depth", self._queue.qsize())
+            start = time.perf_counter()
+            try:
+                vectors = self.model.embed_documents(texts) if texts else []
+            except Exception as exc:
+                logger.exception("embedding batch of %d texts failed", len(texts))
+                for _, future in batch:
+                    future.set_exception(exc)
+                continue
+            metrics.observe("embedding_batch_seconds", time.perf_counter() - start)
+            metrics.increment("embedding_batches_total")
+            metrics.increment("embedding_texts_total", len(texts))
+            with self._lock:
+                self.stats["requests"] += len(batch)
+                self.stats["texts"] += len(texts)
+                self.stats["batches"] += 1
+            offset = 0
+            for request_texts, future in batch:
+                future.set_result(vectors[offset:offset + len(request_texts)])
+                offset += len(request_texts)
+
+# -------------------- Server --------------------
+class EmbeddingHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, so each client reuses its connection
+
+    def do_POST(self):
+        if self.path != "/embed":
+            self.send_error(404)
+            return
+        try:
+            texts = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))["texts"]
+            if not isinstance(texts, list) or not all(isinstance(text, str) for text in texts):
+                raise ValueError("texts must be a list of strings")
+        except (ValueError, KeyError, TypeError) as exc:
+            self.send_error(400, str(exc))
+            return
+        try:
+            embeddings = self.server.batcher.embed(texts)
+        except Exception as exc:
+            self.send_error(500, str(exc))
+            return
+        self._send(json.dumps({"embeddings": embeddings}), "application/json")
+
+    def do_GET(self):
+        batcher = self.server.batcher
+        if self.path == "/health":
+            with batcher._lock:
+                stats = dict(batcher.stats)
+            self._send(json.dumps({"status": "ok", "queue_depth": batcher.queue_depth(), **stats}), "application/json")
+        elif self.path == "/metrics":
+            self._send(metrics.prometheus_text(), "text/plain; version=0.0.4")
+        else:
+            self.send_error(404)
+
+    def _send(self, body, content_type):
+        payload = body.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(model, port=None, host="127.0.0.1", window=None, max_batch=None):
+    """Serve `model` (anything with embed_documents) on a background thread"""
+    metrics.enable()
+    server = ThreadingHTTPServer((host, port or EMBEDDING_SERVER_PORT), EmbeddingHandler)
+    server.daemon_threads = True
+    server.batcher = MicroBatcher(model, window, max_batch)
+    threading.Thread(target=server.serve_forever, name="embedding-server", daemon=True).start()
+    return server
+
+# -------------------- Client --------------------
+class EmbeddingClient:
+    """Drop-in for the LangChain embeddings object, backed by a shared embedding server"""
+
+    def __init__(self, url, timeout=None):
+        parts = urlsplit(url)
+        self.host = parts.hostname or "127.0.0.1"
+        self.port = parts.port or EMBEDDING_SERVER_PORT
+        self.timeout = timeout or EMBED_CLIENT_TIMEOUT
+        self._local = threading.local()  # one keep-alive connection per thread
+
+    def _connection(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = self._local.connection = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+        return connection
+
+    def _post(self, texts):
+        body = json.dumps({"texts": texts})
+        connection = self._connection()
+        try:
+            connection.request("POST", "/embed", body, {"Content-Type": "application/json"})
+            response = connection.getresponse()
+            payload = response.read()
+        except (http.client.HTTPException, OSError):
+            connection.close()
+            self._local.connection = None
+            raise
+        if response.status != 200:
+            raise RuntimeError(f"embedding server returned {response.status}: {response.reason}")
+        return json.loads(payload)["embeddings"]
+
+    def embed_documents(self, texts):
+        texts = list(texts)
+        if not texts:
+            return []
+        try:
+            return self._post(texts)
+        except (http.client.HTTPException, ConnectionError):
+            return self._post(texts)  # the server closed an idle keep-alive connection
+
+    def embed_query(self, text):
+        # MiniLM has no query/document prefixes, so both sides share one code path
+        return self.embed_documents([text])[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=EMBEDDING_SERVER_PORT)
+    parser.add_argument("--backend", help="huggingface or fastembed (default: EMBEDDING_BACKEND)")
+    parser.add_argument("--threads", type=int, help="intra-op threads for the model (default: EMBEDDING_THREADS)")
+    parser.add_argument("--window", type=float, default=EMBED_BATCH_WINDOW, help="seconds to wait while filling a batch")
+    parser.add_argument("--max-batch", type=int, default=EMBED_MAX_BATCH)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO"))
+    from interview_core import EMBEDDING_BACKEND, setup_embeddings
+    model = setup_embeddings(args.backend or EMBEDDING_BACKEND, threads=args.threads)
+    server = serve(model, args.port, args.host, args.window, args.max_batch)
+    logger.info("embedding server listening on http://%s:%d", args.host, args.port)
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+import logging
+import math
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from chunking import page_lines, text_lines
+
+logger = logging.getLogger(__name__)
+
+# -------------------- Configuration --------------------
+MAX_RESUME_BYTES = int(os.getenv("MAX_RESUME_BYTES", str(10 * 2 ** 20)))
+MAX_RESUME_PAGES = int(os.getenv("MAX_RESUME_PAGES", "20"))
+# Documents with at least this many pages are split across a process pool
+PARALLEL_PAGE_THRESHOLD = int(os.getenv("PARALLEL_PAGE_THRESHOLD", "12"))
+EXTRACT_WORKERS = int(os.getenv("EXTRACT_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+
+class ResumeTooLarge(ValueError):
+    pass
+
+
+def read_resume_bytes(file, max_bytes=None):
+    """Read an uploaded file, refusing anything over the byte budget before and while reading"""
+    max_bytes = max_bytes or MAX_RESUME_BYTES
+    size = getattr(file, "size", None)
+    if size is not None and size > max_bytes:
+        raise ResumeTooLarge(f"Resume is {size / 2 ** 20:.1f} MB; the limit is {max_bytes / 2 ** 20:.1f} MB.")
+    data = file.read(max_bytes + 1)
+    if len(data) > max_bytes:
+        raise ResumeTooLarge(f"Resume is larger than the {max_bytes / 2 ** 20:.1f} MB limit.")
+    return data
+
+# -------------------- Page Extraction --------------------
+def _extract_page_range(data, start, stop):
+    """Worker: layout lines for pages [start, stop) of a PDF given as bytes"""
+    import fitz  # PyMuPDF
+    with fitz.open(stream=data, filetype="pdf") as doc:
+        return [page_lines(doc[number]) for number in range(start, stop)]
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_page_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                # spawn: forking a multi-threaded Streamlit worker is not safe
+                _pool = ProcessPoolExecutor(EXTRACT_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+    return _pool
+
+def iter_pdf_pages(data, max_pages=None):
+    """Yield the layout lines of each PDF page in order, lazily, up to the page budget"""
+    import fitz  # PyMuPDF
+    max_pages = max_pages or MAX_RESUME_PAGES
+    with fitz.open(stream=data, filetype="pdf") as doc:
+        page_count = doc.page_count
+        pages = min(page_count, max_pages)
+        if page_count > max_pages:
+            logger.warning("resume has %d pages, extracting the first %d", page_count, max_pages)
+        if pages < PARALLEL_PAGE_THRESHOLD or EXTRACT_WORKERS < 2:
+            for number in range(pages):
+                yield page_lines(doc[number])
+            return
+
+    step = math.ceil(pages / EXTRACT_WORKERS)
+    ranges = [(start, min(start + step, pages)) for start in range(0, pages, step)]
+    pool = get_page_pool()
+    futures = [pool.submit(_extract_page_range, data, start, stop) for start, stop in ranges]
+    for future in futures:  # in page order, as soon as each range is ready
+        yield from future.result()
+
+def iter_resume_pages(data, file_type, max_pages=None):
+    """Yield each page of a PDF/TXT resume (bytes from read_resume_bytes) as a list of chunking.Line"""
+    if file_type == "application/pdf":
+        yield from iter_pdf_pages(data, max_pages)
+    elif file_type == "text/plain":
+        yield text_lines(data.decode("utf-8"))
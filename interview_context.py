@@ -0,0 +1,61 @@
+import os
+import re
+
+from metrics import estimate_tokens
+
+# -------------------- Configuration --------------------
+CONTEXT_RECENT_TURNS = int(os.getenv("CONTEXT_RECENT_TURNS", "2"))
+CONTEXT_SUMMARY_TOKENS = int(os.getenv("CONTEXT_SUMMARY_TOKENS", "250"))
+CONTEXT_DIGEST_WORDS = 25
+
+def first_words(text, limit):
+    words = text.split()
+    return " ".join(words[:limit]) + (" ..." if len(words) > limit else "")
+
+def digest_turn(number, question, answer):
+    """One-line extractive summary of a turn: the question's first sentence and the start of the answer"""
+    question = re.split(r"(?<=[?.!])\s", question.strip(), maxsplit=1)[0]
+    return f"Q{number}: {first_words(question, CONTEXT_DIGEST_WORDS)} | A: {first_words(answer, CONTEXT_DIGEST_WORDS)}"
+
+
+class InterviewContext:
+    """Interview history for technical_agent_question with a bounded prompt size.
+
+    The last few turns are kept verbatim; older turns are folded into a running summary
+    once, when they fall out of the recent window, and the summary is kept under a token
+    budget by dropping its oldest lines. Rendering therefore costs the same on turn 20 as
+    on turn 3.
+    """
+
+    def __init__(self, recent_turns=None, summary_tokens=None):
+        self.recent_turns = recent_turns or CONTEXT_RECENT_TURNS
+        self.summary_tokens = summary_tokens or CONTEXT_SUMMARY_TOKENS
+        self.turn_count = 0
+        self.recent = []  # [(number, question, answer)]
+        self.summary = []  # digest lines, oldest first
+        self.omitted = 0  # turns dropped from the summary to respect the budget
+
+    def extended(self, question, answer):
+        """Return a new context with one more turn; the current one is left untouched"""
+        context = InterviewContext(self.recent_turns, self.summary_tokens)
+        context.turn_count = self.turn_count + 1
+        context.recent = self.recent + [(context.turn_count, question, answer)]
+        context.summary = list(self.summary)
+        context.omitted = self.omitted
+        while len(context.recent) > context.recent_turns:
+            context.summary.append(digest_turn(*context.recent.pop(0)))
+        while len(context.summary) > 1 and sum(map(estimate_tokens, context.summary)) > context.summary_tokens:
+            context.summary.pop(0)
+            context.omitted += 1
+        return context
+
+    def render(self):
+        sections = []
+        if self.summary:
+            header = "Summary of earlier questions"
+            if self.omitted:
+                header += f" ({self.omitted} older turns omitted)"
+            sections.append(header + ":\n" + "\n".join(self.summary))
+        if self.recent:
+            sections.append("\n".join(f"Q: {question}\nA: {answer}" for _, question, answer in self.recent))
+        return "\n\n".join(sections)
@@ -0,0 +1,819 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+
+import metrics
+from chunking import SectionChunker, body_font_size, text_lines, OTHER_SECTION
+from extraction import iter_resume_pages, read_resume_bytes
+from llm import agenerate_groq_response, generate_groq_response, get_backend, set_response_cache
+from completeness import CompletenessScorer
+from moderation import Moderator
+from prompts import Section, build_prompt
+from question_plan import question_difficulty
+from response_cache import ResponseCache, RESPONSE_CACHE_ENABLED, RESPONSE_CACHE_SIMILARITY
+
+logger = logging.getLogger(__name__)
+
+# -------------------- Configuration --------------------
+EMBEDDING_MODEL_NAME = os.getenv("EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+# "huggingface" runs MiniLM on torch; "fastembed" runs a quantized ONNX export of it on ONNX Runtime
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "huggingface")
+EMBEDDING_THREADS = int(os.getenv("EMBEDDING_THREADS", "0")) or None  # None: the runtime's default
+EMBEDDING_SERVER_URL = os.getenv("EMBEDDING_SERVER_URL")  # share one model across workers (embedding_server.py)
+CHROMA_PATH = os.getenv("CHROMA_PATH", "./chroma_db")
+REPORT_CACHE_DIR = os.getenv("REPORT_CACHE_DIR")  # optional disk-backed report store
+# "text": CORRECT:/IMPROVE: prose, streamed and parsed as it arrives. "json" (opt-in): a structured
+# report checked against REPORT_SCHEMA; it is not streamed and a schema miss costs a second, text call
+REPORT_FORMAT = os.getenv("REPORT_FORMAT", "text")
+INGEST_BATCH = int(os.getenv("INGEST_BATCH", "64"))  # chunks embedded and written per round trip
+RETRIEVAL_MAX_CHARS = int(os.getenv("RETRIEVAL_MAX_CHARS", "1536"))  # resume excerpt size per LLM call
+
+# -------------------- Components --------------------
+# Created on first use and shared by every session in the process. The Streamlit app,
+# the benchmark and other headless callers can inject their own with use_components().
+embedding_model = None
+collection = None
+moderator = None
+completeness_scorer = None
+_components_lock = threading.Lock()
+
+def setup_embeddings(backend=None, threads=None):
+    if backend is None and EMBEDDING_SERVER_URL:
+        from embedding_server import EmbeddingClient
+        return EmbeddingClient(EMBEDDING_SERVER_URL)
+    backend = backend or EMBEDDING_BACKEND
+    threads = threads or EMBEDDING_THREADS
+    if backend == "fastembed":
+        # No torch in the process: faster to load and a fraction of the resident memory
+        from langchain_community.embeddings import FastEmbedEmbeddings
+        return FastEmbedEmbeddings(model_name=EMBEDDING_MODEL_NAME, threads=threads)
+    if backend != "huggingface":
+        raise ValueError(f"Unknown EMBEDDING_BACKEND: {backend}")
+    from langchain_community.embeddings import HuggingFaceEmbeddings
+    if threads:
+        import torch
+        torch.set_num_threads(threads)
+    return HuggingFaceEmbeddings(model_name=EMBEDDING_MODEL_NAME)
+
+def setup_chromadb(path=None):
+    import chromadb
+    client = chromadb.PersistentClient(path=path or CHROMA_PATH)
+    return client.get_or_create_collection(name="resumes")
+
+def use_components(embeddings=None, resume_collection=None):
+    """Install the embedding model and/or Chroma collection used by the core functions"""
+    global embedding_model, collection, moderator, completeness_scorer
+    with _components_lock:
+        if embeddings is not None:
+            embedding_model = embeddings
+            moderator = completeness_scorer = None  # rebuilt around the new model
+        if resume_collection is not None:
+            collection = resume_collection
+
+def get_embedding_model():
+    global embedding_model
+    if embedding_model is None:
+        with _components_lock:
+            if embedding_model is None:
+                embedding_model = setup_embeddings()
+    return embedding_model
+
+def get_collection():
+    global collection
+    if collection is None:
+        with _components_lock:
+            if collection is None:
+                collection = setup_chromadb()
+    return collection
+
+def get_moderator():
+    global moderator
+    if moderator is None:
+        embeddings = get_embedding_model()
+        with _components_lock:
+            if moderator is None:
+                moderator = Moderator(remote_agent_monitor, embeddings)
+    return moderator
+
+def get_completeness_scorer():
+    global completeness_scorer
+    if completeness_scorer is None:
+        embeddings = get_embedding_model()
+        with _components_lock:
+            if completeness_scorer is None:
+                completeness_scorer = CompletenessScorer(embeddings)
+    return completeness_scorer
+
+def setup_response_cache():
+    """Install the shared ResponseCache when RESPONSE_CACHE=1"""
+    if RESPONSE_CACHE_ENABLED:
+        # Only the similarity tier needs the embedding model; do not load it for exact matching
+        embeddings = get_embedding_model() if RESPONSE_CACHE_SIMILARITY else None
+        set_response_cache(ResponseCache(embedding_model=embeddings))
+
+def warm_up():
+    """Load the heavy components on a background thread and return it.
+
+    Every getter is lazy and lock-protected, so a request that arrives first simply waits
+    for the same load instead of starting a second one.
+    """
+    def run():
+        start = time.perf_counter()
+        try:
+            setup_response_cache()
+            get_collection()
+            get_moderator().hostility_score("warm up")  # loads MiniLM and embeds the seeds
+            import fitz  # noqa: F401  PyMuPDF, for the first upload
+        except Exception:
+            logger.exception("warm-up failed; components will load on first use")
+        try:
+            get_backend()
+        except Exception:
+            logger.warning("LLM client not created during warm-up", exc_info=True)
+        logger.info("warm-up finished in %.2fs", time.perf_counter() - start)
+
+    thread = threading.Thread(target=run, name="warm-up", daemon=True)
+    thread.start()
+    return thread
+
+# -------------------- Resume Ingestion --------------------
+class ResumeFile:
+    """A local resume file with the `name`/`type`/`size`/`read()` interface of Streamlit's UploadedFile"""
+    TYPES = {".pdf": "application/pdf", ".txt": "text/plain"}
+
+    def __init__(self, path):
+        self.path = path
+        self.name = os.path.basename(path)
+        self.type = self.TYPES.get(os.path.splitext(path)[1].lower(), "application/octet-stream")
+        self.size = os.path.getsize(path)
+
+    def read(self, size=-1):
+        with open(self.path, "rb") as f:
+            return f.read(size)
+
+class ResumeText(str):
+    """Extracted resume text that keeps the PDF layout lines (fonts, sizes) for chunking"""
+    lines = None
+
+@metrics.traced("extract_text_from_resume")
+def extract_text_from_resume(file):
+    data = read_resume_bytes(file)
+    lines = [line for page in iter_resume_pages(data, file.type) for line in page]
+    text = ResumeText("\n".join(line.text for line in lines))
+    text.lines = lines
+    return text
+
+def extract_candidate_name(resume_text):
+    # Simple regex to extract names (look for first capitalized words)
+    name_match = re.search(r"([A-Z][a-z]+\s+[A-Z][a-z]+)", resume_text[:500])
+    if name_match:
+        return name_match.group(1)
+    return "Candidate"
+
+def resume_hash(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+@metrics.traced("store_resume")
+def store_resume(text, user_id):
+    """Ingest already-extracted text; returns the candidate name"""
+    lines = getattr(text, "lines", None) or text_lines(text)
+    return _ingest_pages(resume_hash(text), user_id, [lines])
+
+@metrics.traced("ingest_resume")
+def ingest_resume(file, user_id):
+    """Extract, chunk, embed and store an uploaded resume page by page; returns the candidate name.
+
+    Pages flow through the chunker as they are extracted and chunks are embedded and written
+    in INGEST_BATCH batches, so the full text and all of its embeddings are never in memory
+    together. Raises extraction.ResumeTooLarge when the upload exceeds the byte budget.
+    """
+    data = read_resume_bytes(file)
+    content_hash = hashlib.sha256(data).hexdigest()
+    return _ingest_pages(content_hash, user_id, iter_resume_pages(data, file.type))
+
+def delete_user(user_id):
+    """Remove every chunk stored for `user_id` in one call"""
+    get_collection().delete(where={"user_id": user_id})
+
+def touch_user(user_id):
+    """Restart the retention clock of `user_id`'s chunks (a resumed session); returns how many there are"""
+    collection = get_collection()
+    stored = collection.get(where={"user_id": user_id}, include=["metadatas"])
+    if stored["ids"]:
+        now = time.time()
+        collection.update(ids=stored["ids"], metadatas=[{**meta, "ingested_at": now} for meta in stored["metadatas"]])
+    return len(stored["ids"])
+
+def _ingest_pages(content_hash, user_id, pages):
+    collection = get_collection()
+
+    def chunk_id(i):
+        return f"{user_id}-{content_hash[:16]}-{i}"
+
+    # Chunk 0 is written last, carrying the chunk count, so it only exists for a finished ingest.
+    # Same user re-uploading the same resume (e.g. a Streamlit rerun): nothing to do
+    existing = collection.get(ids=[chunk_id(0)], include=["metadatas"])
+    if existing["ids"]:
+        return existing["metadatas"][0].get("candidate_name", "Candidate")
+
+    # A different resume for this user replaces the previous one
+    delete_user(user_id)
+    ingested_at = time.time()  # read by retention.py to expire abandoned sessions
+
+    # Another session already finished embedding this exact resume: reuse one copy of its vectors
+    finished = collection.get(
+        where={"$and": [{"content_hash": content_hash}, {"chunks": {"$gte": 1}}]}, include=["metadatas"], limit=1
+    )
+    if finished["ids"]:
+        owner = finished["metadatas"][0]["user_id"]
+        cached = collection.get(
+            where={"$and": [{"content_hash": content_hash}, {"user_id": owner}]}, include=["embeddings", "metadatas"]
+        )
+        rows = sorted(zip(cached["metadatas"], cached["embeddings"]), key=lambda row: -row[0]["chunk"])  # chunk 0 last
+        for start in range(0, len(rows), INGEST_BATCH):
+            batch = rows[start:start + INGEST_BATCH]
+            collection.add(
+                ids=[chunk_id(meta["chunk"]) for meta, _ in batch],
+                embeddings=[emb for _, emb in batch],
+                metadatas=[{**meta, "user_id": user_id, "ingested_at": ingested_at} for meta, _ in batch]
+            )
+        return finished["metadatas"][0].get("candidate_name", "Candidate")
+
+    # Split on headings and bullets (using the PDF layout when we have it), not fixed windows
+    chunker = SectionChunker()
+    head = ""
+    candidate_name = None
+    pending = []
+    first = []  # chunk 0 and its embedding, held back until every other chunk is stored
+    count = 0
+
+    def flush():
+        nonlocal candidate_name, count
+        if candidate_name is None:
+            candidate_name = extract_candidate_name(head)
+        embeddings = get_embedding_model().embed_documents([chunk["text"] for chunk in pending])
+        rows = [
+            (
+                {
+                    **chunk, "user_id": user_id, "content_hash": content_hash,
+                    "candidate_name": candidate_name, "ingested_at": ingested_at
+                },
+                embedding
+            )
+            for chunk, embedding in zip(pending, embeddings)
+        ]
+        count += len(rows)
+        first.extend(row for row in rows if row[0]["chunk"] == 0)
+        rows = [row for row in rows if row[0]["chunk"] != 0]
+        if rows:
+            collection.add(
+                ids=[chunk_id(meta["chunk"]) for meta, _ in rows],
+                embeddings=[embedding for _, embedding in rows],
+                metadatas=[meta for meta, _ in rows]
+            )
+        pending.clear()
+
+    try:
+        for lines in pages:
+            body_size = body_font_size(lines)
+            for line in lines:
+                if len(head) < 500:
+                    head += line.text + "\n"
+                pending.extend(chunker.feed(line, body_size))
+                if len(pending) >= INGEST_BATCH:
+                    flush()
+        pending.extend(chunker.finish())
+        if pending:
+            flush()
+        for meta, embedding in first:
+            collection.add(ids=[chunk_id(0)], embeddings=[embedding], metadatas=[{**meta, "chunks": count}])
+    except Exception:
+        # Never leave a partial resume behind: it would look complete to the rerun check above
+        delete_user(user_id)
+        raise
+    return candidate_name or extract_candidate_name(head)
+
+# Sections worth reading for each kind of prompt; other lookups search the whole resume
+TECHNICAL_SECTIONS = ("skills", "projects", "experience")
+BACKGROUND_SECTIONS = ("header", "summary", "experience")
+
+@metrics.traced("retrieve_resume")
+def retrieve_resume(user_id, query, cache=None, sections=None):
+    # Pass a per-session dict as `cache`: the flow asks the same few queries several times per interview
+    cache = {} if cache is None else cache
+    key = (user_id, query, tuple(sections or ()))
+    metrics.increment("cache_hits_total" if key in cache else "cache_misses_total", cache="retrieval")
+    if key not in cache:
+        query_embedding = get_embedding_model().embed_query(query)
+        where = {"user_id": user_id}
+        if sections:
+            where = {"$and": [where, {"section": {"$in": list(sections)}}]}
+        results = get_collection().query(query_embeddings=[query_embedding], n_results=3, where=where)
+        if sections and not results["ids"][0]:
+            # No chunk carries these sections (no headings found): fall back to the whole resume
+            cache[key] = retrieve_resume(user_id, query, cache)
+        else:
+            cache[key] = join_chunks([doc["text"] for doc in results["metadatas"][0]])
+    return cache[key]
+
+def join_chunks(texts, limit=None):
+    """Best-ranked chunks first, dropping whole chunks once `limit` characters are reached"""
+    limit = limit or RETRIEVAL_MAX_CHARS
+    kept, size = [], 0
+    for text in texts:
+        if kept and size + len(text) + 1 > limit:
+            break
+        kept.append(text)
+        size += len(text) + 1
+    return "\n".join(kept)
+
+async def aretrieve_resume(user_id, query, cache=None, sections=None):
+    # Embedding and the Chroma query are blocking calls, so they run on a worker thread
+    return await asyncio.to_thread(retrieve_resume, user_id, query, cache, sections)
+
+# -------------------- Agent Functions --------------------
+# Each agent is a prompt builder shared by a plain function and a coroutine (a*) version
+def greeting_prompt(resume_data, candidate_name):
+    template = """
+    Resume Data: {resume_data}
+    Candidate Name: {candidate_name}
+    
+    Generate a brief, warm greeting for {candidate_name}. The greeting should:
+    1. Begin with "Hello [Candidate Name]" 
+    2. Very briefly mention something from their resume (one skill or experience)
+    3. Ask ONE simple question about their most recent job or experience
+    4. Keep it extremely concise (2-3 short sentences maximum)
+    
+    The greeting must be brief as it will be converted to voice later.
+    """
+    return build_prompt("zero_agent", template, Section("resume_data", resume_data), candidate_name=candidate_name)
+
+def zero_agent_greeting(resume_data, candidate_name, stream=False):
+    return generate_groq_response(greeting_prompt(resume_data, candidate_name), "zero_agent", temperature=0.7, stream=stream)
+
+async def azero_agent_greeting(resume_data, candidate_name, stream=False):
+    return await agenerate_groq_response(greeting_prompt(resume_data, candidate_name), "zero_agent", temperature=0.7, stream=stream)
+
+def technical_question_prompt(resume_data, interview_history, question_count):
+    template = """
+    Resume Data: {resume_data}
+    Interview History: {interview_history}
+    Question Number: {question_number}
+    Difficulty: {difficulty}
+    
+    Generate a relevant technical interview question based on the candidate's resume. The question should:
+    1. Be specific to skills or experiences mentioned in their resume
+    2. Feel like it's coming from someone who has read their background
+    3. Be appropriately challenging based on their experience level
+    4. Be directly relevant to their field
+    5. Be clearly phrased as a question (no preambles or explanations)
+    """
+    # The history already has a bounded size (InterviewContext); the resume gives way first
+    return build_prompt(
+        "technical_agent", template,
+        Section("interview_history", interview_history, keep="tail", priority=1, share=0.5),
+        Section("resume_data", resume_data),
+        question_number=question_count + 1, difficulty=question_difficulty(question_count)
+    )
+
+def technical_agent_question(resume_data, interview_history, question_count, stream=False):
+    prompt = technical_question_prompt(resume_data, interview_history, question_count)
+    return generate_groq_response(prompt, "technical_agent", temperature=0.7, stream=stream)
+
+async def atechnical_agent_question(resume_data, interview_history, question_count, stream=False):
+    prompt = technical_question_prompt(resume_data, interview_history, question_count)
+    return await agenerate_groq_response(prompt, "technical_agent", temperature=0.7, stream=stream)
+
+def needs_clarification(candidate_response):
+    # Check if the response indicates confusion or asks for clarification
+    if any(phrase in candidate_response.lower() for phrase in 
+           ["i don't understand", "can you explain", "not sure", "what do you mean", 
+            "confused", "unclear", "can you clarify", "don't know what"]):
+        return True
+    # A short reply ending in a question is asking one; a "?" inside a real answer is not
+    text = candidate_response.strip()
+    return text.endswith("?") and len(text.split()) <= 20
+
+def clarification_prompt(question, candidate_response, resume_data):
+    template = """
+        Original Question: {question}
+        Candidate Response: {candidate_response}
+        Resume Data: {resume_data}
+        
+        The candidate needs clarification. Your task is to:
+        1. Acknowledge their confusion
+        2. Explain the question in simpler terms
+        3. Provide a concrete example to illustrate what you're asking
+        4. Rephrase the question in a more approachable way
+        
+        IMPORTANT: Respond in a direct, conversational manner WITHOUT any explanation of your reasoning.
+        """
+    return build_prompt("clarification_agent", template, *answer_sections(question, candidate_response, resume_data))
+
+def answer_sections(question, candidate_response, resume_data):
+    return (
+        Section("question", question, priority=2, share=0.25),
+        Section("candidate_response", candidate_response, priority=1, share=0.5),
+        Section("resume_data", resume_data),
+    )
+
+def follow_up_prompt(question, candidate_response, resume_data):
+    # Check if the answer is incomplete and needs a follow-up
+    template = """
+        Original Question: {question}
+        Candidate Response: {candidate_response}
+        Resume Data: {resume_data}
+        
+        Evaluate if this response is complete or needs a follow-up.
+        If the response is thorough and complete, respond with "COMPLETE".
+        If the response is partial or could benefit from elaboration, provide a specific follow-up question.
+        If the response is off-topic, provide a more specific version of the original question.
+        
+        IMPORTANT: If providing a follow-up question, give ONLY the question itself without any explanation of why you're asking it.
+        """
+    return build_prompt("clarification_agent", template, *answer_sections(question, candidate_response, resume_data))
+
+def parse_follow_up(follow_up):
+    if "COMPLETE" in follow_up:
+        return None
+    # Filter out any reasoning or explanation before the question
+    # This regex attempts to find the actual question
+    question_match = re.search(r"(?:To help|I would|Let me|Could you|What|How|Why|Can you|Tell me|Describe|Explain).*\?", follow_up)
+    if question_match:
+        return question_match.group(0)
+    return follow_up
+
+def clarification_agent_response(question, candidate_response, resume_data, stream=False):
+    if needs_clarification(candidate_response):
+        prompt = clarification_prompt(question, candidate_response, resume_data)
+        return generate_groq_response(prompt, "clarification_agent", temperature=0.6, stream=stream)
+    # Clearly complete or clearly thin answers are settled locally; the LLM sees the rest
+    scorer = get_completeness_scorer()
+    assessment = scorer.assess(question, candidate_response, resume_data)
+    if assessment.decided:
+        return assessment.follow_up
+    # The COMPLETE check needs the whole answer, so this branch never streams
+    prompt = follow_up_prompt(question, candidate_response, resume_data)
+    return scorer.record(assessment, parse_follow_up(generate_groq_response(prompt, "clarification_agent", temperature=0.6)))
+
+async def aclarification_agent_response(question, candidate_response, resume_data, stream=False):
+    if needs_clarification(candidate_response):
+        prompt = clarification_prompt(question, candidate_response, resume_data)
+        return await agenerate_groq_response(prompt, "clarification_agent", temperature=0.6, stream=stream)
+    scorer = get_completeness_scorer()
+    assessment = await asyncio.to_thread(scorer.assess, question, candidate_response, resume_data)
+    if assessment.decided:
+        return assessment.follow_up
+    prompt = follow_up_prompt(question, candidate_response, resume_data)
+    return scorer.record(assessment, parse_follow_up(await agenerate_groq_response(prompt, "clarification_agent", temperature=0.6)))
+        
+MARKDOWN = re.compile(
+    # Line prefixes first, so "* item" is a bullet rather than the start of an italic span
+    r"^[ \t]*[-*_]{3,}[ \t]*$|^(?:#+|>)\s+|^[ \t]*(?P<bullet>[-*+])\s+|^[ \t]*\d+\.\s+"
+    r"|\*\*(?P<bold>.*?)\*\*|\*(?P<italic>.*?)\*|`(?P<code>.*?)`|\[(?P<link>.*?)\]\(.*?\)",
+    re.MULTILINE
+)
+
+def _replace_markdown(match):
+    kind = match.lastgroup
+    if kind == "bullet":
+        return "• "
+    if kind == "code":
+        return match.group("code")
+    if kind:
+        return MARKDOWN.sub(_replace_markdown, match.group(kind))  # emphasis inside a link, etc.
+    return ""  # headers, blockquotes, horizontal rules and numbering
+
+def strip_markdown(text):
+    """Remove markdown formatting from text in a single scan"""
+    return MARKDOWN.sub(_replace_markdown, text)
+
+def strip_markdown_stream(chunks):
+    """Apply strip_markdown to streamed text, yielding each line once it is complete"""
+    buffer = ""
+    for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split("\n")
+        for line in lines:
+            yield strip_markdown(line) + "\n"
+    if buffer:
+        yield strip_markdown(buffer)
+
+def report_prompt(interview_data, resume_data, report_format="text"):
+    questions_answers = [
+        f"Q{i+1}: {qa['question']}\nAnswer: {qa['answer']}" 
+        for i, qa in enumerate(interview_data)
+    ]
+    
+    if report_format == "json":
+        template = """
+    Resume Data: {resume_data}
+    
+    Interview Transcript:
+    {questions_answers}
+    
+    Write an interview report that analyzes each answer without scoring or grading, and
+    recommends 3-5 specific technical topics (not platforms) the candidate should focus on.
+    Keep the language encouraging and constructive, in plain text without markdown.
+    
+    Respond with ONLY a JSON object of this shape, with one "questions" entry per question in order:
+    {{"questions": [{{"correct": "what the answer got right", "improve": "what to develop further"}}],
+     "strengths": ["key strength"], "focus_areas": ["focus area"], "topics": ["technical topic"]}}
+    """
+    else:
+        template = """
+    Resume Data: {resume_data}
+    
+    Interview Transcript:
+    {questions_answers}
+    
+    Generate a detailed, visually appealing interview report that:
+    1. Analyzes each answer without scoring or grading
+    2. Identifies correct information (prefix with "CORRECT: ")
+    3. Identifies areas for improvement (prefix with "IMPROVE: ")
+    4. Recommends 3-5 specific technical topics (not platforms) the candidate should focus on
+    
+    Format guidelines:
+    - Use emojis to make sections more engaging (✅ for correct points, 💡 for improvement areas)
+    - ABSOLUTELY NO MARKDOWN SYNTAX - use plain text only without asterisks, backticks, hashes, etc.
+    - Use simple formatting that works well in HTML
+    - For each question, provide concise bullet-point style feedback
+    - Keep language encouraging and constructive
+    
+    Format the report with these sections:
+    - QUESTION ANALYSIS (for each question)
+    - KEY STRENGTHS
+    - FOCUS AREAS
+    - RECOMMENDED TOPICS
+    
+    Do not include any numerical scores or grades.
+    """
+    # Every turn stays in the prompt; long answers are shortened evenly before the resume gives way
+    return build_prompt(
+        "report_agent", template,
+        Section("questions_answers", questions_answers, keep="fair", priority=1, share=0.75),
+        Section("resume_data", resume_data)
+    )
+
+def report_agent_feedback(interview_data, resume_data, stream=False, report_format="text"):
+    prompt = report_prompt(interview_data, resume_data, report_format)
+    if report_format == "json":
+        # Parsed as a whole, so there is nothing to stream; JSON needs more room than prose
+        return generate_groq_response(prompt, "report_agent", temperature=0.3, max_tokens=1500)
+    if stream:
+        return strip_markdown_stream(generate_groq_response(prompt, "report_agent", temperature=0.7, stream=True))
+    feedback = generate_groq_response(prompt, "report_agent", temperature=0.7)
+    return strip_markdown(feedback)  # Apply the markdown stripper
+
+def strict_agent_monitor(candidate_response):
+    # Local tiers settle most answers; only borderline ones reach remote_agent_monitor
+    return get_moderator().check(candidate_response)
+
+async def astrict_agent_monitor(candidate_response):
+    # Mostly local CPU work; the rare remote check runs on the same worker thread
+    return await asyncio.to_thread(strict_agent_monitor, candidate_response)
+
+def remote_agent_monitor(candidate_response):
+    template = """
+    Candidate Response: "{candidate_response}"
+
+    Check for these behaviors strictly but fairly:
+    1. Repeated gibberish or nonsensical keyboard smashing.
+    2. Harsh, rude, or aggressive language.
+    3. Profanity or clearly offensive content.
+
+    If clearly inappropriate (repeated profanity/aggression/gibberish), respond:
+    "INAPPROPRIATE: [reason]"
+
+    If minor awkwardness, occasional mistakes, or nervousness, respond simply:
+    "ACCEPTABLE"
+
+    Be forgiving, human-like, and flexible—only flag clear and serious issues.
+
+    Be human-like: allow up to two minor instances before marking responses as inappropriate. 
+    Only flag as inappropriate after clear repeated offenses (3 or more times) or severe disrespect/profanity.
+    """
+    prompt = build_prompt("technical_agent", template, Section("candidate_response", candidate_response))
+    return generate_groq_response(prompt, "technical_agent", temperature=0.1, task="strict_agent_monitor")
+
+# -------------------- Report --------------------
+def report_cache_key(interview_data, resume_data):
+    payload = json.dumps({"transcript": interview_data, "resume": resume_data}, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def load_cached_report(key):
+    if not REPORT_CACHE_DIR:
+        return None
+    path = os.path.join(REPORT_CACHE_DIR, f"{key}.json")
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        return Report.from_dict(json.load(f))
+
+def save_cached_report(key, report):
+    if not REPORT_CACHE_DIR:
+        return
+    os.makedirs(REPORT_CACHE_DIR, exist_ok=True)
+    path = os.path.join(REPORT_CACHE_DIR, f"{key}.json")
+    with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+        json.dump(report.to_dict(), f)
+    os.replace(f"{path}.tmp", path)  # atomic, so a crash never leaves a half-written report
+
+REPORT_SECTION = re.compile(r"^\W*(QUESTION ANALYSIS|KEY STRENGTHS|FOCUS AREAS)\b", re.IGNORECASE)
+REPORT_MARKER = re.compile(r"(CORRECT:|IMPROVE:|RECOMMENDED TOPICS:?)")
+
+class ReportParser:
+    """Incremental parser for CORRECT/IMPROVE points and recommended topics, fed one line at a time"""
+
+    def __init__(self):
+        self.correct = []
+        self.improve = []
+        self.topics = []
+        self._current = None  # the list whose last entry is still being written
+
+    def feed(self, line):
+        if self._current is self.topics:
+            self._add_topics(line)
+            return
+        if REPORT_SECTION.match(line):
+            self._current = None
+            return
+        pieces = REPORT_MARKER.split(line)
+        self._append(pieces[0])
+        for marker, text in zip(pieces[1::2], pieces[2::2]):
+            if marker.startswith("RECOMMENDED TOPICS"):
+                # Everything after this header is the topic list
+                self._current = self.topics
+                self._add_topics(text)
+                return
+            self._current = self.correct if marker == "CORRECT:" else self.improve
+            self._current.append("")
+            self._append(text)
+
+    def _append(self, text):
+        if self._current is not None:
+            self._current[-1] += text
+
+    def _add_topics(self, text):
+        text = re.sub(r"^\s*(?:•|[-*+])\s*", "", text)
+        for topic in re.split(r'\d+\.\s+', text):
+            topic = topic.strip()
+            if len(topic) > 3:  # Filter out short/empty topics
+                self.topics.append(topic)
+
+REPORT_SCHEMA = {
+    "type": "object",
+    "required": ["questions", "topics"],
+    "properties": {
+        "questions": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "required": ["correct", "improve"],
+                "properties": {"correct": {"type": "string"}, "improve": {"type": "string"}},
+            },
+        },
+        "strengths": {"type": "array", "items": {"type": "string"}},
+        "focus_areas": {"type": "array", "items": {"type": "string"}},
+        "topics": {"type": "array", "items": {"type": "string"}},
+    },
+}
+JSON_TYPES = {"object": dict, "array": list, "string": str}
+
+def schema_errors(value, schema, path="report"):
+    """Where `value` breaks `schema`, for the subset of JSON Schema used by REPORT_SCHEMA"""
+    if not isinstance(value, JSON_TYPES[schema["type"]]):
+        return [f"{path}: expected {schema['type']}"]
+    errors = []
+    if schema["type"] == "object":
+        errors += [f"{path}: missing {key}" for key in schema.get("required", []) if key not in value]
+        for key, subschema in schema.get("properties", {}).items():
+            if key in value:
+                errors += schema_errors(value[key], subschema, f"{path}.{key}")
+    elif schema["type"] == "array" and "items" in schema:
+        for i, item in enumerate(value):
+            errors += schema_errors(item, schema["items"], f"{path}[{i}]")
+    return errors
+
+def parse_json_report(text):
+    """Decode and validate a JSON report; raises ValueError when the model strayed from the schema"""
+    start = text.find("{")
+    if start < 0:
+        raise ValueError("no JSON object in the report")
+    data, _ = json.JSONDecoder().raw_decode(text, start)  # ignores code fences or prose around the object
+    errors = schema_errors(data, REPORT_SCHEMA)
+    if errors:
+        raise ValueError("; ".join(errors[:5]))
+    return data
+
+
+class Report:
+    """Parsed feedback ready to render; parsed once, then served from memory or REPORT_CACHE_DIR"""
+
+    def __init__(self, feedback, processed_feedback, topics, report_format="text"):
+        self.feedback = feedback
+        self.processed_feedback = processed_feedback
+        self.topics = topics
+        self.format = report_format
+
+    def to_dict(self):
+        return {
+            "feedback": self.feedback,
+            "processed_feedback": self.processed_feedback,
+            "topics": self.topics,
+            "format": self.format,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data["feedback"], data["processed_feedback"], data["topics"], data.get("format", "text"))
+
+
+def render_feedback(interview_data, correct_parts, improve_parts):
+    """Per-question HTML from the correct/improve text of each answer, in one pass"""
+    processed_feedback = []
+    for qa_index, qa in enumerate(interview_data):
+        question_section = f"Q{qa_index+1}: {qa['question']}"
+        answer_section = f"Answer: {qa['answer']}"
+
+        correct_html = ""
+        if qa_index < len(correct_parts) and correct_parts[qa_index]:
+            correct_html = f"""
+            <div class="correct-answer">
+                <h4 style="color: #4CD964; margin:0;">✅ Strong Points</h4>
+                <p style="color: #CCCCCC; margin-top:0.5rem;">{correct_parts[qa_index]}</p>
+            </div>
+            """
+
+        improve_html = ""
+        if qa_index < len(improve_parts) and improve_parts[qa_index]:
+            improve_html = f"""
+            <div class="wrong-answer">
+                <h4 style="color: #FF3B30; margin:0;">💡 Areas to Develop</h4>
+                <p style="color: #CCCCCC; margin-top:0.5rem;">{improve_parts[qa_index]}</p>
+            </div>
+            """
+
+        processed_feedback.append({
+            "question": question_section,
+            "answer": answer_section,
+            "correct_html": correct_html,
+            "improve_html": improve_html
+        })
+    return processed_feedback
+
+def build_json_report(interview_data, resume_data):
+    """The structured report; raises ValueError when the model's JSON does not match REPORT_SCHEMA"""
+    feedback = report_agent_feedback(interview_data, resume_data, report_format="json")
+    start = time.perf_counter()
+    data = parse_json_report(feedback)
+    correct_parts = [strip_markdown(item["correct"]).strip() for item in data["questions"]]
+    improve_parts = [strip_markdown(item["improve"]).strip() for item in data["questions"]]
+    topics = [topic for topic in (strip_markdown(topic).strip() for topic in data["topics"]) if topic]
+    metrics.observe("interview_stage_seconds", time.perf_counter() - start, stage="report_parse")
+    return Report(feedback, render_feedback(interview_data, correct_parts, improve_parts), topics, "json")
+
+def build_text_report(interview_data, resume_data, render=None):
+    """Stream the free-text report, parsing it as it arrives; `render` is called with the text so far"""
+    parser = ReportParser()
+    feedback = ""
+    parse_seconds = 0.0
+    for line in report_agent_feedback(interview_data, resume_data, stream=True):
+        start = time.perf_counter()
+        parser.feed(line)
+        parse_seconds += time.perf_counter() - start
+        feedback += line
+        if render:
+            render(feedback)
+    correct_parts = [strip_markdown(part.strip()) for part in parser.correct]
+    improve_parts = [part.strip() for part in parser.improve]
+    metrics.observe("interview_stage_seconds", parse_seconds, stage="report_parse")
+    return Report(feedback, render_feedback(interview_data, correct_parts, improve_parts), parser.topics)
+
+@metrics.traced("build_report")
+def build_report(interview_data, resume_data, render=None, report_format=None):
+    if (report_format or REPORT_FORMAT) == "json":
+        try:
+            return build_json_report(interview_data, resume_data)
+        except ValueError as exc:
+            logger.warning("structured report rejected, falling back to free text: %s", exc)
+            metrics.increment("report_format_fallbacks_total")
+    return build_text_report(interview_data, resume_data, render)
+
+def get_report(interview_data, resume_data, cache=None, render=None):
+    """Generate the final report once per transcript and resume, then serve it from `cache`"""
+    cache = {} if cache is None else cache
+    key = report_cache_key(interview_data, resume_data)
+    metrics.increment("cache_hits_total" if key in cache else "cache_misses_total", cache="report")
+    if key not in cache:
+        report = load_cached_report(key)
+        if report is None:
+            report = build_report(interview_data, resume_data, render)
+            save_cached_report(key, report)
+        cache[key] = report
+    return cache[key]
@@ -0,0 +1,645 @@
+import abc
+import asyncio
+import json
+import os
+import random
+import re
+import threading
+import time
+import weakref
+
+import metrics
+from scheduler import get_scheduler
+
+# -------------------- Configuration --------------------
+GROQ_MODEL = os.getenv("GROQ_MODEL", "llama-3.3-70b-versatile")
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "30"))
+LLM_CONNECT_TIMEOUT = float(os.getenv("LLM_CONNECT_TIMEOUT", "5"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3"))
+LLM_BACKOFF_BASE = float(os.getenv("LLM_BACKOFF_BASE", "0.5"))
+LLM_BACKOFF_MAX = float(os.getenv("LLM_BACKOFF_MAX", "8"))
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "20"))
+
+SYSTEM_PROMPTS = {
+    "zero_agent": """You are the initial interviewer. Your role is to warmly greet the candidate by name and ask general background questions to make them comfortable before transitioning to technical topics. Be conversational, friendly, and engaging. Focus on understanding their motivation, work history, and personality.""",
+
+    "technical_agent": """You are an expert technical interviewer. Analyze the candidate's resume thoroughly and ask highly relevant technical questions that demonstrate your understanding of their background. Your questions should be challenging but fair, focusing on their claimed skills and past projects. Phrase questions clearly and directly.""",
+
+    "clarification_agent": """You are a supportive interviewer who helps clarify questions when candidates need assistance. When a candidate seems confused or directly asks for clarification, explain the question in simpler terms with examples. If they give a partial answer, ask follow-up questions to help them elaborate. Your goal is to maintain conversation flow and help candidates showcase their knowledge.""",
+
+    "report_agent": """You are an interview assessment specialist. Create a detailed, constructive report of the interview without scoring or grading the candidate. Identify correct answers with green text and areas for improvement with red text. Focus on suggesting specific technical topics the candidate should study further rather than platforms or resources. Be encouraging and specific in your feedback.""",
+
+    "candidate_agent": """You are a job candidate in a technical interview, used to generate practice answers. Answer in the first person as the person described in the resume, drawing only on the experience, skills and projects it lists. Be concise and concrete, and sound like a real candidate rather than an assistant: no headings, lists or commentary about the question."""
+}
+DEFAULT_SYSTEM_PROMPT = "You are an AI interview coach."
+
+# -------------------- Backends --------------------
+class Completion(str):
+    """Completion text that also carries the provider's token usage, when it reports one"""
+    prompt_tokens = None
+    completion_tokens = None
+
+
+class LLMBackend(abc.ABC):
+    """Chat completion provider used by generate_groq_response"""
+    # Exceptions worth retrying with backoff (timeouts, dropped connections, 429/5xx)
+    retryable_errors = (ConnectionError, TimeoutError)
+    # The subset that means "slow down": the scheduler holds the model before the retry
+    rate_limit_errors = ()
+
+    @abc.abstractmethod
+    def complete(self, messages, model, temperature, max_tokens):
+        """Return the completion text (a Completion when token usage is known)"""
+
+    def stream(self, messages, model, temperature, max_tokens):
+        # Backends without native streaming deliver the completion as a single chunk
+        yield self.complete(messages, model, temperature, max_tokens)
+
+    async def acomplete(self, messages, model, temperature, max_tokens):
+        # Backends without an async client run the blocking call on a worker thread
+        return await asyncio.to_thread(self.complete, messages, model, temperature, max_tokens)
+
+    async def astream(self, messages, model, temperature, max_tokens):
+        yield await self.acomplete(messages, model, temperature, max_tokens)
+
+    def close(self):
+        pass
+
+
+class GroqBackend(LLMBackend):
+    """Groq API over one pooled keep-alive HTTP transport shared by all calls"""
+
+    def __init__(self, api_key=None, base_url=None, timeout=None, max_connections=None):
+        import groq
+        import httpx
+
+        timeout = httpx.Timeout(timeout or LLM_TIMEOUT, connect=LLM_CONNECT_TIMEOUT)
+        max_connections = max_connections or LLM_MAX_CONNECTIONS
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_connections,
+            keepalive_expiry=120
+        )
+        self.options = {
+            "api_key": api_key or os.getenv("GROQ_API_KEY"),
+            "base_url": base_url,
+            "timeout": timeout,
+            "max_retries": 0,  # retries are handled by generate_groq_response
+        }
+        self.http_client = httpx.Client(timeout=timeout, limits=self.limits)
+        self.client = groq.Groq(http_client=self.http_client, **self.options)
+        # An async client is bound to the event loop it first runs on, so each loop gets its own
+        self._async_clients = weakref.WeakKeyDictionary()  # loop -> (httpx.AsyncClient, AsyncGroq)
+        self._async_lock = threading.Lock()
+        self.retryable_errors = (
+            groq.APIConnectionError,  # includes APITimeoutError
+            groq.RateLimitError,
+            groq.InternalServerError,
+        )
+        self.rate_limit_errors = (groq.RateLimitError,)
+
+    def complete(self, messages, model, temperature, max_tokens):
+        response = self.client.chat.completions.create(
+            model=model,
+            messages=messages,
+            temperature=temperature,
+            max_tokens=max_tokens
+        )
+        return self._completion(response)
+
+    def _completion(self, response):
+        text = Completion(response.choices[0].message.content)
+        if response.usage:
+            text.prompt_tokens = response.usage.prompt_tokens
+            text.completion_tokens = response.usage.completion_tokens
+        return text
+
+    def stream(self, messages, model, temperature, max_tokens):
+        response = self.client.chat.completions.create(
+            model=model,
+            messages=messages,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            stream=True
+        )
+        try:
+            for chunk in response:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        finally:
+            response.close()  # hand the connection back to the pool if the consumer stops early
+
+    def _get_async_client(self):
+        loop = asyncio.get_running_loop()
+        with self._async_lock:
+            clients = self._async_clients.get(loop)
+            if clients is None:
+                import groq
+                import httpx
+                http_client = httpx.AsyncClient(timeout=self.options["timeout"], limits=self.limits)
+                clients = self._async_clients[loop] = (http_client, groq.AsyncGroq(http_client=http_client, **self.options))
+        return clients[1]
+
+    async def acomplete(self, messages, model, temperature, max_tokens):
+        response = await self._get_async_client().chat.completions.create(
+            model=model,
+            messages=messages,
+            temperature=temperature,
+            max_tokens=max_tokens
+        )
+        return self._completion(response)
+
+    async def astream(self, messages, model, temperature, max_tokens):
+        response = await self._get_async_client().chat.completions.create(
+            model=model,
+            messages=messages,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            stream=True
+        )
+        try:
+            async for chunk in response:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        finally:
+            await response.close()
+
+    def close(self):
+        self.http_client.close()
+        with self._async_lock:
+            clients = list(self._async_clients.items())
+            self._async_clients.clear()
+        for loop, (http_client, _) in clients:
+            if loop.is_closed():
+                continue  # its connections went with the loop
+            if loop.is_running():
+                # Closed on the loop that owns it; returns at once when called from that loop
+                asyncio.run_coroutine_threadsafe(http_client.aclose(), loop)
+            else:
+                loop.run_until_complete(http_client.aclose())
+
+
+class FakeBackend(LLMBackend):
+    """Deterministic in-process stand-in for the Groq API, for tests and benchmarks"""
+
+    def __init__(self, latency=0.0, responder=None, token_latency=0.0):
+        self.latency = latency  # time to first token
+        self.token_latency = token_latency  # delay between streamed tokens
+        self.responder = responder or default_fake_response
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def complete(self, messages, model, temperature, max_tokens):
+        text = self._respond(messages, model, temperature, max_tokens)
+        if self.token_latency:
+            time.sleep(self.token_latency * len(re.findall(r"\s*\S+", text)))
+        return text
+
+    def stream(self, messages, model, temperature, max_tokens):
+        text = self._respond(messages, model, temperature, max_tokens)
+        for i, token in enumerate(re.findall(r"\s*\S+|\s+$", text)):
+            if i and self.token_latency:
+                time.sleep(self.token_latency)
+            yield token
+
+    async def acomplete(self, messages, model, temperature, max_tokens):
+        self._record(messages, model, temperature, max_tokens)
+        await asyncio.sleep(self.latency)
+        text = self.responder(messages)
+        if self.token_latency:
+            await asyncio.sleep(self.token_latency * len(re.findall(r"\s*\S+", text)))
+        return text
+
+    async def astream(self, messages, model, temperature, max_tokens):
+        self._record(messages, model, temperature, max_tokens)
+        await asyncio.sleep(self.latency)
+        for i, token in enumerate(re.findall(r"\s*\S+|\s+$", self.responder(messages))):
+            if i and self.token_latency:
+                await asyncio.sleep(self.token_latency)
+            yield token
+
+    def _record(self, messages, model, temperature, max_tokens):
+        with self._lock:
+            self.calls.append({"messages": messages, "model": model, "temperature": temperature, "max_tokens": max_tokens})
+
+    def _respond(self, messages, model, temperature, max_tokens):
+        self._record(messages, model, temperature, max_tokens)
+        if self.latency:
+            time.sleep(self.latency)
+        return self.responder(messages)
+
+
+def default_fake_response(messages):
+    """Canned answers that satisfy the parsing done by the agent functions"""
+    system, prompt = messages[0]["content"], messages[-1]["content"]
+    if "INAPPROPRIATE" in prompt:
+        return "ACCEPTABLE"
+    if "Evaluate if this response is complete" in prompt:
+        return "COMPLETE"
+    if "QUESTION BANK" in prompt:
+        return "\n".join(
+            f"{tier.upper()}:\n" + "\n".join(f"{i}. How would you approach {tier} problem {i} from your resume?" for i in range(1, 4))
+            for tier in ("introductory", "intermediate", "advanced")
+        )
+    if system == SYSTEM_PROMPTS["zero_agent"]:
+        return "Hello Candidate, thanks for joining. What are you working on in your current role?"
+    if system == SYSTEM_PROMPTS["report_agent"]:
+        questions = prompt.count("\nAnswer:")
+        if '"questions"' in prompt:
+            return json.dumps({
+                "questions": [
+                    {"correct": "Clear explanation of the approach.", "improve": "Discuss trade-offs in more depth."}
+                ] * questions,
+                "strengths": ["Structured reasoning"],
+                "focus_areas": ["Depth on trade-offs"],
+                "topics": ["System design", "Testing strategies", "Concurrency"],
+            })
+        analysis = "\n".join(
+            f"Q{i+1}\nCORRECT: Clear explanation of the approach.\nIMPROVE: Discuss trade-offs in more depth."
+            for i in range(questions)
+        )
+        return f"QUESTION ANALYSIS\n{analysis}\nRECOMMENDED TOPICS:\n1. System design\n2. Testing strategies\n3. Concurrency"
+    if system == SYSTEM_PROMPTS["clarification_agent"]:
+        return "Could you walk me through a concrete example of that?"
+    return "How would you design a caching layer for the project described in your resume?"
+
+# -------------------- Shared Client --------------------
+_backend = None
+_backend_lock = threading.Lock()
+
+def get_backend():
+    """Return the process-wide backend, creating the Groq client on first use"""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                _backend = GroqBackend()
+    return _backend
+
+def set_backend(backend):
+    """Swap the process-wide backend (e.g. a FakeBackend) and return the previous one"""
+    global _backend
+    with _backend_lock:
+        previous, _backend = _backend, backend
+    return previous
+
+_response_cache = None
+
+def set_response_cache(cache):
+    """Install a ResponseCache (or None to disable) consulted before every remote call"""
+    global _response_cache
+    _response_cache = cache
+
+def backoff_delay(attempt):
+    # Full jitter: uniform over [0, min(cap, base * 2^attempt)]
+    return random.uniform(0, min(LLM_BACKOFF_MAX, LLM_BACKOFF_BASE * 2 ** attempt))
+
+def build_messages(prompt, agent_type):
+    return [
+        {"role": "system", "content": SYSTEM_PROMPTS.get(agent_type, DEFAULT_SYSTEM_PROMPT)},
+        {"role": "user", "content": prompt}
+    ]
+
+def cached_response(cache, agent_type, temperature, prompt):
+    if cache is None:
+        return None
+    cached = cache.get(agent_type, temperature, prompt)
+    metrics.increment("cache_hits_total" if cached is not None else "cache_misses_total", cache="response")
+    return cached
+
+async def acached_response(cache, agent_type, temperature, prompt):
+    if cache is None:
+        return None
+    cached = await cache.aget(agent_type, temperature, prompt)
+    metrics.increment("cache_hits_total" if cached is not None else "cache_misses_total", cache="response")
+    return cached
+
+def request_slot(task, messages):
+    """Model and priority for one call, as decided by the process-wide scheduler"""
+    tokens = sum(metrics.estimate_tokens(message["content"]) for message in messages)
+    return get_scheduler().slot(task, GROQ_MODEL, tokens)
+
+def generate_groq_response(prompt, agent_type, temperature=0.7, max_tokens=800, stream=False, task=None):
+    """Return the completion text, or an iterator of text chunks when `stream` is set.
+
+    `task` names the call for scheduling (priority class and fallback routing); it defaults
+    to `agent_type`.
+    """
+    messages = build_messages(prompt, agent_type)
+    cache = _response_cache
+    cached = cached_response(cache, agent_type, temperature, prompt)
+    if cached is not None:
+        return iter([cached]) if stream else cached
+
+    backend = get_backend()
+    slot = request_slot(task or agent_type, messages)
+    if stream:
+        chunks = _stream_with_retries(backend, messages, temperature, max_tokens, slot)
+        if cache is not None:
+            chunks = _cache_stream(chunks, cache, agent_type, temperature, prompt)
+        return _traced_stream(chunks, agent_type, messages) if metrics.enabled() else chunks
+
+    # Identical calls already in flight (a double submit, the same answer checked twice) share one request
+    key = (agent_type, slot.model, temperature, max_tokens, prompt)
+    return get_scheduler().coalesced(key, lambda: _generate(backend, messages, agent_type, temperature, max_tokens, slot, cache, prompt))
+
+def _generate(backend, messages, agent_type, temperature, max_tokens, slot, cache, prompt):
+    start = time.perf_counter()
+    try:
+        text = _complete_with_retries(backend, messages, temperature, max_tokens, slot)
+    except Exception:
+        metrics.increment("llm_errors_total", agent_type=agent_type)
+        raise
+    finally:
+        metrics.observe("llm_request_seconds", time.perf_counter() - start, agent_type=agent_type)
+    record_usage(agent_type, messages, text)
+    if cache is not None:
+        cache.put(agent_type, temperature, prompt, text)
+    return text
+
+def record_usage(agent_type, messages, text):
+    if not metrics.enabled():
+        return
+    # Prefer the provider's counts; streamed and fake completions fall back to an estimate
+    prompt_tokens = getattr(text, "prompt_tokens", None) or sum(metrics.estimate_tokens(m["content"]) for m in messages)
+    completion_tokens = getattr(text, "completion_tokens", None) or metrics.estimate_tokens(text)
+    metrics.increment("llm_requests_total", agent_type=agent_type)
+    metrics.increment("llm_prompt_tokens_total", prompt_tokens, agent_type=agent_type)
+    metrics.increment("llm_completion_tokens_total", completion_tokens, agent_type=agent_type)
+
+def _traced_stream(chunks, agent_type, messages):
+    start = time.perf_counter()
+    text = ""
+    try:
+        for chunk in chunks:
+            if not text:
+                metrics.observe("llm_first_token_seconds", time.perf_counter() - start, agent_type=agent_type)
+            text += chunk
+            yield chunk
+    except Exception:
+        metrics.increment("llm_errors_total", agent_type=agent_type)
+        raise
+    finally:
+        metrics.observe("llm_request_seconds", time.perf_counter() - start, agent_type=agent_type)
+    record_usage(agent_type, messages, text)
+
+def _cache_stream(chunks, cache, agent_type, temperature, prompt):
+    text = ""
+    for chunk in chunks:
+        text += chunk
+        yield chunk
+    # Only reached when the stream ran to completion, so partial answers are never cached
+    cache.put(agent_type, temperature, prompt, text)
+
+def retry_delay(backend, error, slot, attempt):
+    delay = backoff_delay(attempt)
+    if isinstance(error, backend.rate_limit_errors):
+        get_scheduler().pause(slot.model, delay)  # hold every caller of the model, not just this one
+    metrics.increment("llm_retries_total")
+    return delay
+
+def _complete_with_retries(backend, messages, temperature, max_tokens, slot):
+    scheduler = get_scheduler()
+    for attempt in range(LLM_MAX_RETRIES + 1):
+        scheduler.acquire(slot)
+        try:
+            text = backend.complete(messages, slot.model, temperature, max_tokens)
+        except backend.retryable_errors as e:
+            if attempt == LLM_MAX_RETRIES:
+                raise
+            time.sleep(retry_delay(backend, e, slot, attempt))
+            continue
+        scheduler.charge(slot.model, getattr(text, "completion_tokens", None) or metrics.estimate_tokens(text))
+        return text
+
+def _stream_with_retries(backend, messages, temperature, max_tokens, slot):
+    scheduler = get_scheduler()
+    for attempt in range(LLM_MAX_RETRIES + 1):
+        scheduler.acquire(slot)
+        text = ""
+        try:
+            for chunk in backend.stream(messages, slot.model, temperature, max_tokens):
+                text += chunk
+                yield chunk
+            return
+        except backend.retryable_errors as e:
+            # Once tokens have been shown a retry would duplicate them
+            if text or attempt == LLM_MAX_RETRIES:
+                raise
+            time.sleep(retry_delay(backend, e, slot, attempt))
+        finally:
+            scheduler.charge(slot.model, metrics.estimate_tokens(text))
+
+# -------------------- Async Calls --------------------
+async def agenerate_groq_response(prompt, agent_type, temperature=0.7, max_tokens=800, stream=False, task=None):
+    """Coroutine version of generate_groq_response; streams as an async iterator of chunks"""
+    messages = build_messages(prompt, agent_type)
+    cache = _response_cache
+    cached = await acached_response(cache, agent_type, temperature, prompt)
+    if cached is not None:
+        return _aiter_once(cached) if stream else cached
+
+    backend = get_backend()
+    slot = request_slot(task or agent_type, messages)
+    if stream:
+        chunks = _astream_with_retries(backend, messages, temperature, max_tokens, slot)
+        if cache is not None:
+            chunks = _acache_stream(chunks, cache, agent_type, temperature, prompt)
+        return _atraced_stream(chunks, agent_type, messages) if metrics.enabled() else chunks
+
+    key = (agent_type, slot.model, temperature, max_tokens, prompt)
+    return await get_scheduler().acoalesced(key, lambda: _agenerate(backend, messages, agent_type, temperature, max_tokens, slot, cache, prompt))
+
+async def _agenerate(backend, messages, agent_type, temperature, max_tokens, slot, cache, prompt):
+    start = time.perf_counter()
+    try:
+        text = await _acomplete_with_retries(backend, messages, temperature, max_tokens, slot)
+    except Exception:
+        metrics.increment("llm_errors_total", agent_type=agent_type)
+        raise
+    finally:
+        metrics.observe("llm_request_seconds", time.perf_counter() - start, agent_type=agent_type)
+    record_usage(agent_type, messages, text)
+    if cache is not None:
+        await cache.aput(agent_type, temperature, prompt, text)
+    return text
+
+async def _aiter_once(text):
+    yield text
+
+async def _atraced_stream(chunks, agent_type, messages):
+    start = time.perf_counter()
+    text = ""
+    try:
+        async for chunk in chunks:
+            if not text:
+                metrics.observe("llm_first_token_seconds", time.perf_counter() - start, agent_type=agent_type)
+            text += chunk
+            yield chunk
+    except Exception:
+        metrics.increment("llm_errors_total", agent_type=agent_type)
+        raise
+    finally:
+        metrics.observe("llm_request_seconds", time.perf_counter() - start, agent_type=agent_type)
+    record_usage(agent_type, messages, text)
+
+async def _acache_stream(chunks, cache, agent_type, temperature, prompt):
+    text = ""
+    async for chunk in chunks:
+        text += chunk
+        yield chunk
+    await cache.aput(agent_type, temperature, prompt, text)
+
+async def _acomplete_with_retries(backend, messages, temperature, max_tokens, slot):
+    scheduler = get_scheduler()
+    for attempt in range(LLM_MAX_RETRIES + 1):
+        await scheduler.aacquire(slot)
+        try:
+            text = await backend.acomplete(messages, slot.model, temperature, max_tokens)
+        except backend.retryable_errors as e:
+            if attempt == LLM_MAX_RETRIES:
+                raise
+            await asyncio.sleep(retry_delay(backend, e, slot, attempt))
+            continue
+        scheduler.charge(slot.model, getattr(text, "completion_tokens", None) or metrics.estimate_tokens(text))
+        return text
+
+async def _astream_with_retries(backend, messages, temperature, max_tokens, slot):
+    scheduler = get_scheduler()
+    for attempt in range(LLM_MAX_RETRIES + 1):
+        await scheduler.aacquire(slot)
+        text = ""
+        try:
+            async for chunk in backend.astream(messages, slot.model, temperature, max_tokens):
+                text += chunk
+                yield chunk
+            return
+        except backend.retryable_errors as e:
+            if text or attempt == LLM_MAX_RETRIES:
+                raise
+            await asyncio.sleep(retry_delay(backend, e, slot, attempt))
+        finally:
+            scheduler.charge(slot.model, metrics.estimate_tokens(text))
+
+
+class EventLoopThread:
+    """One asyncio loop on a daemon thread, shared by every session of the process.
+
+    Coroutines submitted from a script run keep going after the run ends, so work started
+    on one rerun (the next question, say) can be picked up by a later one.
+    """
+
+    def __init__(self, workers=None, name="llm-loop"):
+        from concurrent.futures import ThreadPoolExecutor
+        self.loop = asyncio.new_event_loop()
+        if workers:
+            # asyncio.to_thread() work: retrieval, embeddings and local moderation
+            self.loop.set_default_executor(ThreadPoolExecutor(workers, thread_name_prefix=f"{name}-worker"))
+        threading.Thread(target=self.loop.run_forever, name=name, daemon=True).start()
+
+    def submit(self, coro):
+        """Schedule `coro` on the loop; returns a concurrent.futures.Future"""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+# -------------------- Background Streams --------------------
+class TokenStream:
+    """Streamed completion produced on a worker thread and replayed on the UI thread as it grows"""
+
+    def __init__(self):
+        self._chunks = []
+        self._task = None
+        self._done = False
+        self._cancelled = False
+        self._is_none = False
+        self._error = None
+        self._cond = threading.Condition()
+
+    def run(self, func, *args, **kwargs):
+        """Call `func` and consume its result: a chunk iterator, a complete string or None"""
+        source = None
+        try:
+            if self._cancelled:
+                return
+            source = func(*args, **kwargs)
+            if source is None:
+                self._is_none = True
+                return
+            if isinstance(source, str):
+                source = [source]
+            for chunk in source:
+                with self._cond:
+                    if self._cancelled:
+                        break
+                    self._chunks.append(chunk)
+                    self._cond.notify_all()
+        except Exception as e:
+            self._error = e
+        finally:
+            close = getattr(source, "close", None)
+            if close:
+                close()
+            with self._cond:
+                self._done = True
+                self._cond.notify_all()
+
+    async def arun(self, func, *args, **kwargs):
+        """Like run() for a coroutine function returning an async iterator, a string or None"""
+        source = None
+        self._task = asyncio.current_task()
+        try:
+            if self._cancelled:
+                return
+            source = await func(*args, **kwargs)
+            if source is None:
+                self._is_none = True
+                return
+            if isinstance(source, str):
+                source = _aiter_once(source)
+            async for chunk in source:
+                with self._cond:
+                    if self._cancelled:
+                        break
+                    self._chunks.append(chunk)
+                    self._cond.notify_all()
+        except Exception as e:
+            self._error = e
+        finally:
+            aclose = getattr(source, "aclose", None)
+            if aclose:
+                await aclose()
+            with self._cond:
+                self._done = True
+                self._cond.notify_all()
+
+    def snapshot(self):
+        """Text received so far and whether the stream has finished, without blocking"""
+        with self._cond:
+            if self._done and self._error:
+                raise self._error
+            return "".join(self._chunks), self._done
+
+    def __iter__(self):
+        i = 0
+        while True:
+            with self._cond:
+                while i >= len(self._chunks) and not self._done:
+                    self._cond.wait()
+                if i < len(self._chunks):
+                    chunk = self._chunks[i]
+                    i += 1
+                elif self._error:
+                    raise self._error
+                else:
+                    return
+            yield chunk
+
+    def result(self):
+        """Block until the stream finishes and return the full text (None if the call returned None)"""
+        text = "".join(self)
+        return None if self._is_none else text
+
+    def cancel(self):
+        with self._cond:
+            self._cancelled = True
+        if self._task is not None:
+            self._task.get_loop().call_soon_threadsafe(self._task.cancel)
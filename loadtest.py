@@ -0,0 +1,282 @@
+"""Load test: many concurrent interview sessions against a fake LLM and one shared chroma_db.
+
+    python loadtest.py --sessions 40 --concurrency 10 --latency 0.5 --token-latency 0.01
+    python loadtest.py --sessions 40 --concurrency 10 --workers 4 --fake-embeddings --json load.json
+
+Each session follows the app's flow on the async core: upload, greeting (with the first
+question written alongside), technical turns where moderation, the follow-up check and the
+next question run concurrently, clarification rounds, and the report. --workers runs that
+many processes against the same Chroma directory, like several Streamlit workers would.
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import resource
+import shutil
+import tempfile
+import threading
+import time
+import tracemalloc
+import uuid
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+
+import llm
+import metrics
+import interview_core as core
+from interview_context import InterviewContext
+from metrics import percentile
+from offline import CLARIFICATION_ANSWER, SAMPLE_RESUME, SCRIPTED_ANSWERS, HashEmbeddings, StageTimer
+
+DEFAULT_ANSWER = "I would need to think about that more carefully."
+
+
+class MemoryResume:
+    """In-memory upload; each session gets a unique copy so ingestion really embeds"""
+    type = "text/plain"
+
+    def __init__(self, text, name="resume.txt"):
+        self.data = text.encode("utf-8")
+        self.name = name
+        self.size = len(self.data)
+
+    def read(self, size=-1):
+        return self.data if size < 0 else self.data[:size]
+
+
+class TimedCollection:
+    """Chroma collection proxy that times every call and counts SQLite "database is locked" errors"""
+    TIMED = ("add", "get", "query", "delete", "count", "upsert")
+
+    def __init__(self, collection):
+        self._collection = collection
+        self.durations = defaultdict(list)
+        self.lock_errors = 0
+        self._lock = threading.Lock()
+
+    def __getattr__(self, name):
+        attr = getattr(self._collection, name)
+        if name not in self.TIMED:
+            return attr
+
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return attr(*args, **kwargs)
+            except Exception as exc:
+                if "locked" in str(exc).lower():
+                    with self._lock:
+                        self.lock_errors += 1
+                raise
+            finally:
+                self.durations[name].append(time.perf_counter() - start)
+        return timed
+
+
+def current_rss_mb():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+    except OSError:  # not Linux: the peak is the best we have
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+# -------------------- Session --------------------
+async def run_session(resume_text, timer, questions=5):
+    """One interview driven the way app.py drives it; returns the number of answered turns"""
+    user_id = str(uuid.uuid4())
+    retrieval_cache = {}
+
+    async def write_question(history, question_count):
+        resume_data = await core.aretrieve_resume(user_id, "technical skills", retrieval_cache, sections=core.TECHNICAL_SECTIONS)
+        return await core.atechnical_agent_question(resume_data, history, question_count)
+
+    async def write_clarification(question, answer):
+        resume_data = await core.aretrieve_resume(user_id, question, retrieval_cache)
+        return await core.aclarification_agent_response(question, answer, resume_data)
+
+    with timer.stage("ingest_resume"):
+        upload = MemoryResume(f"{resume_text}\nCandidate reference: {user_id}\n")
+        candidate_name = await asyncio.to_thread(core.ingest_resume, upload, user_id)
+
+    with timer.stage("greeting"):
+        pending = asyncio.ensure_future(write_question("", 0))
+        resume_data = await core.aretrieve_resume(user_id, "background experience", retrieval_cache, sections=core.BACKGROUND_SECTIONS)
+        question = await core.azero_agent_greeting(resume_data, candidate_name)
+
+    responses = []
+    context = InterviewContext()
+    answers = iter(SCRIPTED_ANSWERS)
+    while question is not None:
+        answer = next(answers, DEFAULT_ANSWER)
+        responses.append({"question": question, "answer": answer})
+        context = context.extended(question, answer)
+        with timer.stage("turn"):
+            if pending is None and len(responses) < questions + 1:
+                pending = asyncio.ensure_future(write_question(context.render(), len(responses) - 1))
+            verdict, follow_up = await asyncio.gather(core.astrict_agent_monitor(answer), write_clarification(question, answer))
+            if "INAPPROPRIATE:" in verdict:
+                if pending:
+                    pending.cancel()
+                break
+            if not follow_up:
+                question, pending = (await pending if pending else None), None
+        if follow_up:
+            with timer.stage("turn"):
+                await core.astrict_agent_monitor(CLARIFICATION_ANSWER)
+                responses[-1]["clarification"] = follow_up
+                responses[-1]["clarification_response"] = CLARIFICATION_ANSWER
+                question, pending = (await pending if pending else None), None
+
+    with timer.stage("report"):
+        resume_data = await core.aretrieve_resume(user_id, "complete profile", retrieval_cache)
+        await asyncio.to_thread(core.build_report, responses, resume_data)
+    return len(responses)
+
+# -------------------- Worker --------------------
+async def run_sessions(sessions, concurrency, resume_text, timer, questions):
+    limit = asyncio.Semaphore(concurrency)
+    results = {"turns": 0, "errors": 0}
+
+    async def one():
+        async with limit:
+            try:
+                with timer.stage("session"):
+                    results["turns"] += await run_session(resume_text, timer, questions)
+            except Exception as exc:
+                results["errors"] += 1
+                results.setdefault("first_error", repr(exc))
+
+    await asyncio.gather(*(one() for _ in range(sessions)))
+    return results
+
+def run_worker(sessions, concurrency, resume_text, latency, token_latency, fake_embeddings, chroma_path, questions):
+    """Run `sessions` interviews, `concurrency` at a time, in this process; returns raw samples"""
+    llm.set_backend(llm.FakeBackend(latency=latency, token_latency=token_latency))
+    collection = TimedCollection(core.setup_chromadb(chroma_path))
+    core.use_components(
+        embeddings=HashEmbeddings() if fake_embeddings else core.setup_embeddings(),
+        resume_collection=collection
+    )
+    metrics.enable()
+    timer = StageTimer()
+    core.get_moderator()  # load models before measuring memory
+    rss_before = current_rss_mb()
+    tracemalloc.start()
+    started = time.perf_counter()
+    results = asyncio.run(run_sessions(sessions, concurrency, resume_text, timer, questions))
+    elapsed = time.perf_counter() - started
+    _, heap_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        **results,
+        "sessions": sessions,
+        "elapsed_s": elapsed,
+        "durations": dict(timer.durations),
+        "collection": dict(collection.durations),
+        "lock_errors": collection.lock_errors,
+        "rss_growth_mb": current_rss_mb() - rss_before,
+        "heap_peak_mb": heap_peak / 2 ** 20,
+        "concurrency": concurrency,
+    }
+
+# -------------------- Driver --------------------
+def percentiles(values):
+    return {
+        "count": len(values),
+        "p50_ms": percentile(values, 50) * 1000,
+        "p90_ms": percentile(values, 90) * 1000,
+        "p99_ms": percentile(values, 99) * 1000,
+        "max_ms": max(values, default=0.0) * 1000,
+    }
+
+def run_load_test(sessions, concurrency, workers, resume_text, latency, token_latency, fake_embeddings, chroma_path, questions=5):
+    shares = [sessions // workers + (1 if i < sessions % workers else 0) for i in range(workers)]
+    args = [(share, concurrency, resume_text, latency, token_latency, fake_embeddings, chroma_path, questions) for share in shares if share]
+    started = time.perf_counter()
+    if len(args) == 1:
+        reports = [run_worker(*args[0])]
+    else:
+        # spawn: each worker builds its own Chroma client, as separate Streamlit processes would
+        with ProcessPoolExecutor(len(args), mp_context=multiprocessing.get_context("spawn")) as pool:
+            reports = list(pool.map(run_worker, *zip(*args)))
+    elapsed = time.perf_counter() - started
+
+    stages, operations = defaultdict(list), defaultdict(list)
+    for report in reports:
+        for name, values in report["durations"].items():
+            stages[name].extend(values)
+        for name, values in report["collection"].items():
+            operations[name].extend(values)
+    completed = sum(report["sessions"] - report["errors"] for report in reports)
+    turns = sum(report["turns"] for report in reports)
+    return {
+        "sessions": sessions,
+        "concurrency_per_worker": concurrency,
+        "workers": len(reports),
+        "elapsed_s": elapsed,
+        "completed_sessions": completed,
+        "errors": sum(report["errors"] for report in reports),
+        "first_error": next((report["first_error"] for report in reports if "first_error" in report), None),
+        "sessions_per_min": completed / elapsed * 60 if elapsed else 0.0,
+        "turns_per_s": turns / elapsed if elapsed else 0.0,
+        "stages": {name: percentiles(values) for name, values in sorted(stages.items())},
+        "chroma": {name: percentiles(values) for name, values in sorted(operations.items())},
+        "chroma_lock_errors": sum(report["lock_errors"] for report in reports),
+        # Memory held per live session: growth of each worker over its concurrent sessions
+        "rss_per_session_mb": max(report["rss_growth_mb"] / min(report["concurrency"], report["sessions"]) for report in reports),
+        "heap_per_session_mb": max(report["heap_peak_mb"] / min(report["concurrency"], report["sessions"]) for report in reports),
+    }
+
+def print_summary(results):
+    print(
+        f"{results['completed_sessions']}/{results['sessions']} sessions in {results['elapsed_s']:.2f}s "
+        f"on {results['workers']} worker(s) x {results['concurrency_per_worker']} concurrent "
+        f"({results['sessions_per_min']:.1f} sessions/min, {results['turns_per_s']:.2f} turns/s, {results['errors']} errors)"
+    )
+    for title, table in (("stage", results["stages"]), ("chroma op", results["chroma"])):
+        print(f"{title:<20}{'count':>8}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+        for name, stats in table.items():
+            print(f"{name:<20}{stats['count']:>8}{stats['p50_ms']:>10.1f}{stats['p90_ms']:>10.1f}{stats['p99_ms']:>10.1f}{stats['max_ms']:>10.1f}")
+    if results["first_error"]:
+        print(f"First error: {results['first_error']}")
+    print(f"SQLite lock errors: {results['chroma_lock_errors']}")
+    print(f"Memory per live session: {results['rss_per_session_mb']:.2f} MB RSS, {results['heap_per_session_mb']:.2f} MB Python heap")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=20, help="interviews to run in total")
+    parser.add_argument("--concurrency", type=int, default=10, help="sessions in flight per worker")
+    parser.add_argument("--workers", type=int, default=1, help="processes sharing the Chroma directory")
+    parser.add_argument("--questions", type=int, default=5, help="technical questions per interview")
+    parser.add_argument("--resume", help="TXT resume to use (default: a built-in sample)")
+    parser.add_argument("--latency", type=float, default=0.5, help="fake LLM time to first token, seconds")
+    parser.add_argument("--token-latency", type=float, default=0.0, help="fake LLM delay per generated token, seconds")
+    parser.add_argument("--fake-embeddings", action="store_true", help="use hashed bag-of-words vectors instead of MiniLM")
+    parser.add_argument("--chroma-path", help="Chroma directory (default: a throwaway temp dir)")
+    parser.add_argument("--json", dest="json_path", help="also write results to this JSON file")
+    args = parser.parse_args()
+
+    resume_text = SAMPLE_RESUME
+    if args.resume:
+        with open(args.resume, encoding="utf-8") as f:
+            resume_text = f.read()
+    workdir = tempfile.mkdtemp(prefix="interview-load-")
+    try:
+        results = run_load_test(
+            args.sessions, args.concurrency, args.workers, resume_text, args.latency, args.token_latency,
+            args.fake_embeddings, args.chroma_path or os.path.join(workdir, "chroma_db"), args.questions
+        )
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print_summary(results)
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
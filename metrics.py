@@ -0,0 +1,209 @@
+import cProfile
+import functools
+import json
+import math
+import os
+import threading
+import time
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# -------------------- Configuration --------------------
+TRACING_ENABLED = os.getenv("TRACING", "0") == "1"
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+PROFILE_DIR = os.getenv("PROFILE_DIR", "./profiles")
+PROFILER = os.getenv("PROFILER", "cprofile")  # or "pyinstrument"
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_enabled = TRACING_ENABLED
+_lock = threading.Lock()
+_counters = defaultdict(float)  # (name, labels) -> value
+_histograms = {}  # (name, labels) -> {"buckets": [...], "sum": float, "count": int}
+_gauges = {}  # (name, labels) -> current value
+
+def estimate_tokens(text):
+    return math.ceil(len(text) / 4)  # ~4 characters per token for English prose
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    rank = (len(ordered) - 1) * pct / 100
+    low, high = math.floor(rank), math.ceil(rank)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+# -------------------- Recording --------------------
+def enabled():
+    return _enabled
+
+def enable(on=True):
+    global _enabled
+    _enabled = on
+
+def reset():
+    with _lock:
+        _counters.clear()
+        _histograms.clear()
+        _gauges.clear()
+
+def _labels(labels):
+    return tuple(sorted(labels.items()))
+
+def increment(name, value=1, **labels):
+    if not _enabled:
+        return
+    with _lock:
+        _counters[(name, _labels(labels))] += value
+
+def set_gauge(name, value, **labels):
+    if not _enabled:
+        return
+    with _lock:
+        _gauges[(name, _labels(labels))] = value
+
+def observe(name, seconds, **labels):
+    if not _enabled:
+        return
+    key = (name, _labels(labels))
+    with _lock:
+        histogram = _histograms.get(key)
+        if histogram is None:
+            histogram = _histograms[key] = {"buckets": [0] * len(BUCKETS), "sum": 0.0, "count": 0}
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                histogram["buckets"][i] += 1
+        histogram["sum"] += seconds
+        histogram["count"] += 1
+
+def traced(stage):
+    """Record duration and errors of a hot-path function under `stage`; a flag check when disabled"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            except Exception:
+                increment("interview_stage_errors_total", stage=stage)
+                raise
+            finally:
+                observe("interview_stage_seconds", time.perf_counter() - start, stage=stage)
+        return wrapper
+    return decorator
+
+# -------------------- Export --------------------
+def snapshot():
+    """All metrics as plain JSON-serializable data"""
+    with _lock:
+        counters = [{"name": name, "labels": dict(labels), "value": value} for (name, labels), value in _counters.items()]
+        gauges = [{"name": name, "labels": dict(labels), "value": value} for (name, labels), value in _gauges.items()]
+        histograms = [
+            {
+                "name": name,
+                "labels": dict(labels),
+                "count": h["count"],
+                "sum": h["sum"],
+                "mean": h["sum"] / h["count"] if h["count"] else 0.0,
+                "buckets": dict(zip(map(str, BUCKETS), h["buckets"])),
+            }
+            for (name, labels), h in _histograms.items()
+        ]
+    return {"counters": counters, "gauges": gauges, "histograms": histograms}
+
+def json_dump(path):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(snapshot(), f, indent=2)
+
+def _format_labels(labels, **extra):
+    items = list(labels) + sorted(extra.items())
+    if not items:
+        return ""
+    return "{" + ",".join(f'{key}="{value}"' for key, value in items) + "}"
+
+def prometheus_text():
+    """Metrics in the Prometheus text exposition format"""
+    lines = []
+    with _lock:
+        for (name, labels), value in sorted(_counters.items()):
+            lines.append(f"{name}{_format_labels(labels)} {value}")
+        for (name, labels), value in sorted(_gauges.items()):
+            lines.append(f"{name}{_format_labels(labels)} {value}")
+        for (name, labels), h in sorted(_histograms.items()):
+            for bound, count in zip(BUCKETS, h["buckets"]):
+                lines.append(f"{name}_bucket{_format_labels(labels, le=bound)} {count}")
+            lines.append(f"{name}_bucket{_format_labels(labels, le='+Inf')} {h['count']}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {h['sum']}")
+            lines.append(f"{name}_count{_format_labels(labels)} {h['count']}")
+    return "\n".join(lines) + "\n"
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path == "/metrics":
+            body, content_type = prometheus_text(), "text/plain; version=0.0.4"
+        elif self.path == "/metrics.json":
+            body, content_type = json.dumps(snapshot()), "application/json"
+        else:
+            self.send_error(404)
+            return
+        payload = body.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass  # keep scrapes out of the app log
+
+
+def serve(port=None):
+    """Enable tracing and expose /metrics and /metrics.json on a background thread"""
+    enable()
+    server = ThreadingHTTPServer(("127.0.0.1", port or METRICS_PORT), MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+    return server
+
+# -------------------- Profiling --------------------
+class SessionProfiler:
+    """Opt-in cProfile (or pyinstrument) capture of one session's script runs"""
+
+    def __init__(self, name, output_dir=None, profiler=None):
+        self.name = name
+        self.output_dir = output_dir or PROFILE_DIR
+        self.kind = profiler or PROFILER
+        self._running = False
+        if self.kind == "pyinstrument":
+            from pyinstrument import Profiler
+            self._profiler = Profiler()
+        else:
+            self._profiler = cProfile.Profile()
+
+    def start(self):
+        if self._running:
+            return
+        self._running = True
+        if self.kind == "pyinstrument":
+            self._profiler.start()
+        else:
+            self._profiler.enable()
+
+    def stop(self):
+        """Pause capture and write the profile collected so far; returns the output path"""
+        if not self._running:
+            return None
+        self._running = False
+        os.makedirs(self.output_dir, exist_ok=True)
+        if self.kind == "pyinstrument":
+            self._profiler.stop()
+            path = os.path.join(self.output_dir, f"{self.name}.html")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(self._profiler.output_html())
+        else:
+            self._profiler.disable()
+            path = os.path.join(self.output_dir, f"{self.name}.prof")
+            self._profiler.dump_stats(path)
+        return path
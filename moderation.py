@@ -0,0 +1,132 @@
+import logging
+import math
+import os
+import re
+import time
+from collections import Counter
+
+logger = logging.getLogger(__name__)
+
+# -------------------- Configuration --------------------
+# Scores below LOW are accepted locally, scores at or above HIGH are rejected locally,
+# everything in between is sent to the remote LLM monitor.
+MODERATION_LOW = float(os.getenv("MODERATION_LOW", "0.35"))
+MODERATION_HIGH = float(os.getenv("MODERATION_HIGH", "0.9"))
+MODERATION_SIMILARITY = float(os.getenv("MODERATION_SIMILARITY", "0.6"))
+
+PROFANITY = [
+    "fuck", "fucking", "fucker", "shit", "shitty", "bullshit", "bitch", "bastard",
+    "asshole", "dick", "dickhead", "cunt", "prick", "wanker", "motherfucker",
+    "screw you", "stfu", "wtf",
+]
+# Everyday words some interviewers frown on; they only ever make an answer borderline
+MILD_PROFANITY = ["damn", "crap", "piss"]
+
+def word_pattern(words):
+    return re.compile(r"\b(?:" + "|".join(sorted(map(re.escape, words), key=len, reverse=True)) + r")\b", re.IGNORECASE)
+
+PROFANITY_PATTERN = word_pattern(PROFANITY)
+MILD_PROFANITY_PATTERN = word_pattern(MILD_PROFANITY)
+
+# Rude or hostile answers that contain no profanity, used for the embedding tier
+HOSTILE_SEEDS = [
+    "This is a stupid question and you are wasting my time.",
+    "Shut up, I am not answering that.",
+    "You are an idiot interviewer.",
+    "I hate this interview and I hate you.",
+    "Go away, this is pointless garbage.",
+    "Who cares, this company is a joke.",
+]
+
+WORD_PATTERN = re.compile(r"[A-Za-z0-9']+")
+URL_PATTERN = re.compile(r"(?:https?://|www\.)\S+|\S+@\S+\.\w+", re.IGNORECASE)  # links and emails are not words
+REPEATED_CHAR = re.compile(r"(.)\1{3,}")
+
+# -------------------- Local Checks --------------------
+def char_entropy(text):
+    """Shannon entropy in bits per character; English prose sits around 4, key mashing far lower"""
+    counts = Counter(text.lower())
+    total = len(text)
+    return -sum(n / total * math.log2(n / total) for n in counts.values())
+
+def is_gibberish_word(word):
+    if len(word) < 5 or any(c.isdigit() for c in word) or word.isupper():
+        return False  # short words, versions and acronyms (k8s, SQL, HTTP2) are fine
+    lower = word.lower()
+    # Consonant clusters alone are not enough: "strengths" and "lengths" are real words
+    return not any(c in "aeiouy" for c in lower) or bool(REPEATED_CHAR.search(lower))
+
+def gibberish_score(text):
+    text = URL_PATTERN.sub(" ", text)
+    words = WORD_PATTERN.findall(text)
+    if not words:
+        return 0.6 if text.strip() else 0.0  # only symbols, e.g. "???" - let the LLM decide
+    score = sum(map(is_gibberish_word, words)) / len(words)
+    if len(words) < 3:
+        score = min(score, 0.6)  # a single mashed word is not yet "repeated" gibberish
+    compact = re.sub(r"\s+", "", text)
+    if len(compact) >= 20 and char_entropy(compact) < 3.0:
+        # Repetitive but real answers have low entropy too, so this only makes the answer borderline
+        score = max(score, MODERATION_HIGH - 0.01)
+    return score
+
+def profanity_score(text):
+    hits = len(PROFANITY_PATTERN.findall(text))
+    # Up to two slips are left to the LLM's judgement, three or more are a clear offence
+    if hits >= 3:
+        return 1.0, hits
+    if hits or MILD_PROFANITY_PATTERN.search(text):
+        return 0.5, hits
+    return 0.0, hits
+
+def cosine_similarity(a, b):
+    dot = sum(x * y for x, y in zip(a, b))
+    norm = math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b))
+    return dot / norm if norm else 0.0
+
+# -------------------- Tiered Moderator --------------------
+class Moderator:
+    """Cheap local checks first; the remote LLM monitor only sees borderline answers"""
+
+    def __init__(self, remote_monitor, embedding_model=None):
+        self.remote_monitor = remote_monitor
+        self.embedding_model = embedding_model
+        self._seed_embeddings = None
+
+    def hostility_score(self, text):
+        if self.embedding_model is None:
+            return 0.0
+        if self._seed_embeddings is None:
+            self._seed_embeddings = self.embedding_model.embed_documents(HOSTILE_SEEDS)
+        embedding = self.embedding_model.embed_query(text)
+        similarity = max(cosine_similarity(embedding, seed) for seed in self._seed_embeddings)
+        # Similarity alone can only make an answer borderline, never reject it
+        return min(similarity, MODERATION_HIGH - 0.01) if similarity >= MODERATION_SIMILARITY else 0.0
+
+    def check(self, candidate_response):
+        """Return "ACCEPTABLE" or "INAPPROPRIATE: <reason>", like strict_agent_monitor"""
+        start = time.perf_counter()
+        gibberish = gibberish_score(candidate_response)
+        profanity, hits = profanity_score(candidate_response)
+        score = max(gibberish, profanity)
+        if score < MODERATION_HIGH:
+            score = max(score, self.hostility_score(candidate_response))
+
+        if score >= MODERATION_HIGH:
+            tier = "local"
+            if profanity >= gibberish:
+                verdict = f"INAPPROPRIATE: Repeated profanity ({hits} instances) in your response."
+            else:
+                verdict = "INAPPROPRIATE: Your response appears to be repeated gibberish or keyboard smashing."
+        elif score < MODERATION_LOW:
+            tier = "local"
+            verdict = "ACCEPTABLE"
+        else:
+            tier = "remote"
+            verdict = self.remote_monitor(candidate_response)
+
+        logger.info(
+            "moderation tier=%s score=%.2f latency_ms=%.1f verdict=%s",
+            tier, score, (time.perf_counter() - start) * 1000, verdict.split(":")[0].strip()
+        )
+        return verdict
@@ -0,0 +1,143 @@
+import functools
+import os
+
+import metrics
+from llm import DEFAULT_SYSTEM_PROMPT, SYSTEM_PROMPTS
+
+# -------------------- Configuration --------------------
+# tiktoken encoding used to count tokens; without tiktoken installed, ~4 characters per token.
+# Either way counts are estimates: the Groq models use the Llama tokenizer, not cl100k_base.
+PROMPT_TOKENIZER = os.getenv("PROMPT_TOKENIZER", "cl100k_base")
+# Estimated input tokens (system + user prompt) allowed per agent; the completion's max_tokens comes on top
+PROMPT_BUDGETS = {
+    "zero_agent": int(os.getenv("PROMPT_BUDGET_ZERO_AGENT", "1500")),
+    "technical_agent": int(os.getenv("PROMPT_BUDGET_TECHNICAL_AGENT", "3000")),
+    "clarification_agent": int(os.getenv("PROMPT_BUDGET_CLARIFICATION_AGENT", "2000")),
+    "report_agent": int(os.getenv("PROMPT_BUDGET_REPORT_AGENT", "6000")),
+    "candidate_agent": int(os.getenv("PROMPT_BUDGET_CANDIDATE_AGENT", "1500")),  # batch.py --synthetic
+}
+DEFAULT_PROMPT_BUDGET = int(os.getenv("PROMPT_BUDGET_DEFAULT", "3000"))
+# Share of each budget left unused to absorb the error of the estimate
+PROMPT_BUDGET_HEADROOM = float(os.getenv("PROMPT_BUDGET_HEADROOM", "0.1"))
+TRUNCATION_MARKER = " [...]"
+
+# -------------------- Token Counting --------------------
+_encoder = None
+_encoder_loaded = False
+
+def get_encoder():
+    global _encoder, _encoder_loaded
+    if not _encoder_loaded:
+        try:
+            import tiktoken
+            _encoder = tiktoken.get_encoding(PROMPT_TOKENIZER)
+        except Exception:  # not installed, or the encoding cannot be downloaded
+            _encoder = None
+        _encoder_loaded = True
+    return _encoder
+
+def count_tokens(text):
+    """Estimated token count of `text` (see PROMPT_TOKENIZER)"""
+    encoder = get_encoder()
+    return len(encoder.encode(text)) if encoder else metrics.estimate_tokens(text)
+
+@functools.lru_cache(maxsize=None)
+def system_tokens(agent_type):
+    """Tokens of an agent's system prompt, which is sent unchanged with every call"""
+    return count_tokens(SYSTEM_PROMPTS.get(agent_type, DEFAULT_SYSTEM_PROMPT))
+
+def _cut(text, limit, keep):
+    """At most `limit` tokens of `text` from its start ("head") or end ("tail")"""
+    encoder = get_encoder()
+    if encoder:
+        tokens = encoder.encode(text)
+        return encoder.decode(tokens[:limit] if keep == "head" else tokens[len(tokens) - limit:])
+    chars = limit * 4
+    return text[:chars] if keep == "head" else text[len(text) - chars:]
+
+def truncate_tokens(text, limit, keep="head"):
+    """Shorten `text` to `limit` tokens, preferring to cut at a line break, and mark the cut"""
+    if count_tokens(text) <= limit:
+        return text
+    limit -= count_tokens(TRUNCATION_MARKER)
+    if limit <= 0:
+        return ""
+    kept = _cut(text, limit, keep)
+    # Drop the partial line at the cut unless that would throw away most of what we kept
+    if keep == "head":
+        newline = kept.rfind("\n")
+        kept = kept[:newline] if newline > len(kept) // 2 else kept
+        return kept.rstrip() + TRUNCATION_MARKER
+    newline = kept.find("\n")
+    kept = kept[newline + 1:] if 0 <= newline < len(kept) // 2 else kept
+    return TRUNCATION_MARKER.strip() + " " + kept.lstrip()
+
+def fair_shares(sizes, budget):
+    """Split `budget` over items of the given sizes: small items keep everything, large ones share the rest"""
+    shares = [0] * len(sizes)
+    remaining = budget
+    order = sorted(range(len(sizes)), key=lambda i: sizes[i])
+    for position, i in enumerate(order):
+        shares[i] = min(sizes[i], remaining // (len(order) - position))
+        remaining -= shares[i]
+    return shares
+
+# -------------------- Prompt Assembly --------------------
+class Section:
+    """A variable part of a prompt template that may be shortened to fit the budget.
+
+    `keep` is "head" (most relevant text first, e.g. retrieved resume chunks), "tail" (newest
+    text last, e.g. interview history) or "fair" for a list of items that share the space
+    evenly, each keeping its start (e.g. transcript turns). Sections with a higher `priority`
+    are given their space first; `share` caps the fraction of the budget one section may use.
+    """
+
+    def __init__(self, name, text, keep="head", priority=0, share=1.0, separator="\n\n"):
+        self.name = name
+        self.text = text
+        self.keep = keep
+        self.priority = priority
+        self.share = share
+        self.separator = separator
+        self._sizes = None  # token count of the text, or of each item for "fair"; counted once
+
+    def sizes(self):
+        if self._sizes is None:
+            self._sizes = [count_tokens(item) for item in self.text] if self.keep == "fair" else count_tokens(self.text)
+        return self._sizes
+
+    def size(self):
+        if self.keep == "fair":
+            return sum(self.sizes()) + count_tokens(self.separator) * max(len(self.text) - 1, 0)
+        return self.sizes()
+
+    def fit(self, limit):
+        if self.keep == "fair":
+            limit -= count_tokens(self.separator) * max(len(self.text) - 1, 0)
+            shares = fair_shares(self.sizes(), max(limit, 0))
+            return self.separator.join(truncate_tokens(item, share) for item, share in zip(self.text, shares))
+        return truncate_tokens(self.text, limit, self.keep)
+
+
+def build_prompt(agent_type, template, *sections, budget=None, **fixed):
+    """Fill `template` (str.format style) so the system and user prompt fit the agent's token budget.
+
+    Keyword arguments are inserted as-is; each Section is shortened as needed.
+    """
+    budget = int((budget or PROMPT_BUDGETS.get(agent_type, DEFAULT_PROMPT_BUDGET)) * (1 - PROMPT_BUDGET_HEADROOM))
+    skeleton = template.format(**fixed, **{section.name: "" for section in sections})
+    available = max(budget - system_tokens(agent_type) - count_tokens(skeleton), 0)
+
+    values = {}
+    for section in sorted(sections, key=lambda section: -section.priority):
+        size = section.size()
+        limit = min(size, available, int(budget * section.share))
+        values[section.name] = section.fit(limit)
+        if limit < size:
+            metrics.increment("prompt_truncations_total", agent_type=agent_type, section=section.name)
+            metrics.increment("prompt_truncated_tokens_total", size - limit, agent_type=agent_type, section=section.name)
+        available -= limit
+
+    prompt = template.format(**fixed, **values)
+    metrics.increment("prompt_input_tokens_total", system_tokens(agent_type) + count_tokens(prompt), agent_type=agent_type)
+    return prompt
@@ -0,0 +1,135 @@
+import asyncio
+import os
+import re
+
+import metrics
+from llm import agenerate_groq_response
+from moderation import cosine_similarity
+from prompts import Section, build_prompt
+
+# -------------------- Configuration --------------------
+QUESTION_PLAN_ENABLED = os.getenv("QUESTION_PLAN", "0") == "1"
+QUESTION_PLAN_SIZE = int(os.getenv("QUESTION_PLAN_SIZE", "3"))  # questions per difficulty tier
+# Below this similarity between the last answer and every planned question the plan is abandoned for the turn
+QUESTION_PLAN_MIN_SIMILARITY = float(os.getenv("QUESTION_PLAN_MIN_SIMILARITY", "0.2"))
+QUESTION_PLAN_ADAPT = os.getenv("QUESTION_PLAN_ADAPT", "1") == "1"  # 0: ask planned questions verbatim
+
+TIERS = ("introductory", "intermediate", "advanced")
+TIER_HEADING = re.compile(r"^\W*(introductory|intermediate|advanced)\b", re.IGNORECASE)
+PLAN_ITEM = re.compile(r"^\s*(?:\d+[.)]|[-*•])\s*(.+)$")
+
+def question_difficulty(question_count):
+    return "introductory" if question_count < 2 else "intermediate" if question_count < 4 else "advanced"
+
+# -------------------- Prompts --------------------
+def plan_prompt(resume_data, size=None):
+    template = """
+    Resume Data: {resume_data}
+
+    Write a QUESTION BANK for a technical interview based on this resume: {size} questions for each
+    difficulty tier. Every question must be specific to skills or experiences in the resume and
+    clearly phrased as a question. Cover different topics within each tier.
+
+    Use exactly this format, with no other text:
+    INTRODUCTORY:
+    1. <question>
+    INTERMEDIATE:
+    1. <question>
+    ADVANCED:
+    1. <question>
+    """
+    return build_prompt("technical_agent", template, Section("resume_data", resume_data), size=size or QUESTION_PLAN_SIZE)
+
+def adapt_prompt(question, last_answer):
+    template = """
+    Planned Question: {question}
+    Candidate's Last Answer: {last_answer}
+
+    Rewrite the planned question so it follows naturally from the candidate's last answer.
+    Keep its topic and difficulty. Respond with ONLY the question.
+    """
+    return build_prompt(
+        "technical_agent", template,
+        Section("question", question, priority=1, share=0.25),
+        Section("last_answer", last_answer)
+    )
+
+def parse_plan(text):
+    """{tier: [question, ...]} from a QUESTION BANK completion"""
+    questions = {tier: [] for tier in TIERS}
+    tier = None
+    for line in text.splitlines():
+        line = line.replace("*", "").strip()
+        heading = TIER_HEADING.match(line)
+        if heading and len(line) < 40:
+            tier = heading.group(1).lower()
+            continue
+        item = PLAN_ITEM.match(line)
+        if tier and item and len(item.group(1)) > 10:
+            questions[tier].append(item.group(1).strip())
+    return questions
+
+# -------------------- Plan --------------------
+class QuestionPlan:
+    """Questions written ahead of time per difficulty tier, handed out one per turn"""
+
+    def __init__(self, questions, embeddings=None):
+        self.questions = questions
+        self.embeddings = embeddings or {}  # question -> vector
+        self.used = set()
+
+    def remaining(self, tier):
+        return [question for question in self.questions.get(tier, []) if question not in self.used]
+
+    def pick(self, tier, answer_embedding=None):
+        """The unused `tier` question closest to the last answer, with its similarity"""
+        candidates = self.remaining(tier)
+        if not candidates:
+            return None, 0.0
+        if answer_embedding is None or not self.embeddings:
+            return candidates[0], 1.0
+        scored = [(cosine_similarity(answer_embedding, self.embeddings[question]), question) for question in candidates]
+        similarity, question = max(scored)
+        return question, similarity
+
+    def reset(self):
+        self.used.clear()
+
+
+async def abuild_question_plan(resume_data, embedding_model=None, size=None):
+    """Write the whole question bank in one call and embed it for matching against answers"""
+    text = await agenerate_groq_response(
+        plan_prompt(resume_data, size), "technical_agent", temperature=0.7, max_tokens=1200, task="question_plan"
+    )
+    questions = parse_plan(text)
+    embeddings = {}
+    flat = [question for tier in TIERS for question in questions[tier]]
+    if embedding_model is not None and flat:
+        embeddings = dict(zip(flat, await asyncio.to_thread(embedding_model.embed_documents, flat)))
+    metrics.increment("question_plan_questions_total", len(flat))
+    return QuestionPlan(questions, embeddings)
+
+async def aplanned_question(plan, question_count, last_answer="", embedding_model=None, stream=False):
+    """Next question from the plan, lightly adapted to the last answer.
+
+    Returns None when the tier is used up or the answer has moved away from every planned
+    question; the caller then writes a fresh question as usual.
+    """
+    tier = question_difficulty(question_count)
+    answer_embedding = None
+    if last_answer and embedding_model is not None and plan.embeddings:
+        answer_embedding = await asyncio.to_thread(embedding_model.embed_query, last_answer)
+    question, similarity = plan.pick(tier, answer_embedding)
+    if question is None:
+        metrics.increment("question_plan_total", outcome="exhausted")
+        return None
+    if similarity < QUESTION_PLAN_MIN_SIMILARITY:
+        metrics.increment("question_plan_total", outcome="diverged")
+        return None
+    plan.used.add(question)
+    metrics.increment("question_plan_total", outcome="planned")
+    if not QUESTION_PLAN_ADAPT or not last_answer:
+        return question
+    return await agenerate_groq_response(
+        adapt_prompt(question, last_answer), "technical_agent", temperature=0.3, max_tokens=120, stream=stream
+    )
@@ -0,0 +1,111 @@
+import asyncio
+import hashlib
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+# -------------------- Configuration --------------------
+RESPONSE_CACHE_ENABLED = os.getenv("RESPONSE_CACHE", "0") == "1"
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "2048"))
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "3600"))
+# Approximate matching is off unless a similarity threshold is given. MiniLM only reads the
+# first 256 word pieces of a prompt, so keep the threshold high and the agent list short.
+RESPONSE_CACHE_SIMILARITY = float(os.getenv("RESPONSE_CACHE_SIMILARITY", "0") or 0)
+RESPONSE_CACHE_SEMANTIC_AGENTS = set(filter(None, os.getenv("RESPONSE_CACHE_SEMANTIC_AGENTS", "zero_agent,technical_agent").split(",")))
+
+def normalize_prompt(prompt):
+    # Agent prompts are indented f-strings; layout differences should not miss the cache
+    return re.sub(r"\s+", " ", prompt).strip()
+
+def prompt_key(agent_type, temperature, prompt):
+    digest = hashlib.sha256(normalize_prompt(prompt).encode("utf-8")).hexdigest()
+    return (agent_type, round(temperature, 2), digest)
+
+
+class ResponseCache:
+    """LRU + TTL cache of LLM completions with an optional embedding-similarity tier"""
+
+    def __init__(self, max_entries=None, ttl=None, embedding_model=None, similarity=None):
+        self.max_entries = max_entries or RESPONSE_CACHE_MAX_ENTRIES
+        self.ttl = ttl if ttl is not None else RESPONSE_CACHE_TTL
+        self.similarity = similarity if similarity is not None else RESPONSE_CACHE_SIMILARITY
+        self.embedding_model = embedding_model if self.similarity else None
+        self.stats = {"hits": 0, "semantic_hits": 0, "misses": 0, "evictions": 0, "expired": 0}
+        self._entries = OrderedDict()  # key -> (expires_at, text, embedding)
+        self._lock = threading.Lock()
+
+    def _semantic(self, agent_type):
+        return self.embedding_model is not None and agent_type in RESPONSE_CACHE_SEMANTIC_AGENTS
+
+    def _embed(self, prompt):
+        import numpy as np
+
+        vector = np.asarray(self.embedding_model.embed_query(normalize_prompt(prompt)), dtype=np.float32)
+        return vector / (np.linalg.norm(vector) or 1.0)
+
+    def get(self, agent_type, temperature, prompt):
+        key = prompt_key(agent_type, temperature, prompt)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] > now:
+                self._entries.move_to_end(key)
+                self.stats["hits"] += 1
+                return entry[1]
+            if entry:
+                del self._entries[key]
+                self.stats["expired"] += 1
+
+        if self._semantic(agent_type):
+            text = self._nearest(key, self._embed(prompt), now)
+            if text is not None:
+                with self._lock:
+                    self.stats["semantic_hits"] += 1
+                return text
+
+        with self._lock:
+            self.stats["misses"] += 1
+        return None
+
+    def _nearest(self, key, embedding, now):
+        import numpy as np
+
+        with self._lock:
+            candidates = [
+                (k, entry) for k, entry in self._entries.items()
+                if k[:2] == key[:2] and entry[2] is not None and entry[0] > now
+            ]
+        if not candidates:
+            return None
+        scores = np.stack([entry[2] for _, entry in candidates]) @ embedding
+        best = int(scores.argmax())
+        if scores[best] < self.similarity:
+            return None
+        return candidates[best][1][1]
+
+    def put(self, agent_type, temperature, prompt, text):
+        key = prompt_key(agent_type, temperature, prompt)
+        embedding = self._embed(prompt) if self._semantic(agent_type) else None
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, text, embedding)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats["evictions"] += 1
+
+    # The similarity tier runs MiniLM, which would block the shared event loop: go through a worker thread
+    async def aget(self, agent_type, temperature, prompt):
+        if self._semantic(agent_type):
+            return await asyncio.to_thread(self.get, agent_type, temperature, prompt)
+        return self.get(agent_type, temperature, prompt)
+
+    async def aput(self, agent_type, temperature, prompt, text):
+        if self._semantic(agent_type):
+            await asyncio.to_thread(self.put, agent_type, temperature, prompt, text)
+        else:
+            self.put(agent_type, temperature, prompt, text)
+
+    def __len__(self):
+        return len(self._entries)
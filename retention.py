@@ -0,0 +1,203 @@
+"""Retention for the resume vector store: session TTL, per-session deletion and compaction.
+
+    python retention.py stats
+    python retention.py compact --ttl 86400
+
+Every chunk carries an `ingested_at` timestamp. Chunks older than the TTL are deleted in bulk;
+the app does this on a timer. `compact` from the command line also deletes chunks from before
+timestamps were recorded and vacuums the SQLite file behind Chroma, and must run with the app stopped.
+
+The HNSW index is not compacted: Chroma only marks deleted vectors, and new chunks reuse their
+slots, so regular expiry keeps the index from growing but never shrinks its files. Re-ingesting
+into a fresh CHROMA_PATH is the only way to get that space back.
+"""
+import argparse
+import logging
+import os
+import sqlite3
+import threading
+import time
+import weakref
+
+import metrics
+import interview_core as core
+
+logger = logging.getLogger(__name__)
+
+# -------------------- Configuration --------------------
+RETENTION_TTL = float(os.getenv("RETENTION_TTL", str(24 * 3600)))  # seconds a session's chunks are kept
+RETENTION_INTERVAL = float(os.getenv("RETENTION_INTERVAL", "3600"))  # seconds between compactions, 0 = never
+SCAN_PAGE_SIZE = 1000
+
+def _scan_metadatas(collection):
+    """Yield (id, metadata) for every chunk, a page at a time"""
+    offset = 0
+    while True:
+        page = collection.get(include=["metadatas"], limit=SCAN_PAGE_SIZE, offset=offset)
+        if not page["ids"]:
+            return
+        yield from zip(page["ids"], page["metadatas"])
+        offset += len(page["ids"])
+
+def _delete_ids(collection, ids):
+    for start in range(0, len(ids), SCAN_PAGE_SIZE):
+        collection.delete(ids=ids[start:start + SCAN_PAGE_SIZE])
+
+# -------------------- Expiry --------------------
+def expire(collection=None, ttl=None, now=None):
+    """Delete chunks ingested more than `ttl` seconds ago; returns how many were removed"""
+    collection = collection or core.get_collection()
+    ttl = RETENTION_TTL if ttl is None else ttl
+    cutoff = (now or time.time()) - ttl
+    before = collection.count()
+    collection.delete(where={"ingested_at": {"$lt": cutoff}})
+    removed = before - collection.count()
+    metrics.increment("retention_deleted_total", removed, reason="ttl")
+    return removed
+
+def purge_untimestamped(collection=None):
+    """Delete chunks stored before ingest times were recorded: they can never expire otherwise"""
+    collection = collection or core.get_collection()
+    ids = [chunk_id for chunk_id, meta in _scan_metadatas(collection) if "ingested_at" not in (meta or {})]
+    _delete_ids(collection, ids)
+    metrics.increment("retention_deleted_total", len(ids), reason="untimestamped")
+    return len(ids)
+
+def vacuum(path=None):
+    """Return freed SQLite pages to the filesystem; returns the bytes reclaimed.
+
+    Only safe while no Chroma client has the store open, so the app never calls it.
+    """
+    database = os.path.join(path or core.CHROMA_PATH, "chroma.sqlite3")
+    if not os.path.exists(database):
+        return 0
+    before = os.path.getsize(database)
+    try:
+        with sqlite3.connect(database, timeout=30) as connection:
+            connection.execute("VACUUM")
+    except sqlite3.OperationalError as exc:
+        # Another worker is writing; the next scheduled run will try again
+        logger.warning("could not vacuum %s: %s", database, exc)
+        return 0
+    return before - os.path.getsize(database)
+
+def compact(collection=None, ttl=None, path=None, sessions=None, offline=False):
+    """Expire old sessions (and the session store's logs).
+
+    `offline` (the CLI, with the app stopped) also drops untimestamped chunks, a one-off
+    migration that scans the whole collection, and vacuums the store.
+    """
+    start = time.perf_counter()
+    result = {"expired": expire(collection, ttl)}
+    if offline:
+        result["untimestamped"] = purge_untimestamped(collection)
+        result["reclaimed_bytes"] = vacuum(path)
+    if sessions is not None:
+        result["expired_sessions"] = sessions.expire()
+    metrics.observe("retention_compact_seconds", time.perf_counter() - start)
+    logger.info("compaction: %s in %.2fs", result, time.perf_counter() - start)
+    return result
+
+def start_retention(interval=None, sessions=None):
+    """Run compact() every `interval` seconds on a daemon thread"""
+    interval = interval or RETENTION_INTERVAL
+
+    def run():
+        while True:
+            time.sleep(interval)
+            try:
+                compact(sessions=sessions)
+            except Exception:
+                logger.exception("scheduled compaction failed")
+
+    thread = threading.Thread(target=run, name="retention", daemon=True)
+    thread.start()
+    return thread
+
+# -------------------- Sessions --------------------
+def end_session(user_id):
+    try:
+        core.delete_user(user_id)
+    except Exception:
+        logger.exception("could not delete chunks of session %s", user_id)
+
+
+class SessionLease:
+    """Keep one in a session's state: its chunks are deleted when Streamlit discards the session.
+
+    Sessions that outlive the lease (a crashed worker) are left for the TTL to expire.
+    """
+
+    def __init__(self, user_id):
+        self.user_id = user_id
+        self._finalizer = weakref.finalize(self, end_session, user_id)
+
+    def release(self):
+        self._finalizer()
+
+# -------------------- Stats --------------------
+def directory_size(path):
+    return sum(
+        os.path.getsize(os.path.join(root, name))
+        for root, _, names in os.walk(path) for name in names
+    )
+
+def collection_stats(collection=None, path=None, probes=50):
+    """Size of the store and query latency measured with stored vectors as probes"""
+    collection = collection or core.get_collection()
+    path = path or core.CHROMA_PATH
+    users = set()
+    times = []
+    for _, meta in _scan_metadatas(collection):
+        meta = meta or {}
+        users.add(meta.get("user_id"))
+        if "ingested_at" in meta:
+            times.append(meta["ingested_at"])
+    count = collection.count()
+
+    latencies = []
+    if count and probes:
+        sample = collection.get(include=["embeddings"], limit=probes)
+        for embedding in sample["embeddings"]:
+            start = time.perf_counter()
+            collection.query(query_embeddings=[list(embedding)], n_results=min(3, count))
+            latencies.append(time.perf_counter() - start)
+
+    now = time.time()
+    return {
+        "chunks": count,
+        "users": len(users),
+        "untimestamped_chunks": count - len(times),
+        "oldest_age_h": (now - min(times)) / 3600 if times else None,
+        "disk_mb": directory_size(path) / 2 ** 20 if os.path.isdir(path) else 0.0,
+        "query_p50_ms": metrics.percentile(latencies, 50) * 1000,
+        "query_p95_ms": metrics.percentile(latencies, 95) * 1000,
+    }
+
+def print_stats(label, stats):
+    age = f"{stats['oldest_age_h']:.1f}h" if stats["oldest_age_h"] is not None else "-"
+    print(
+        f"{label:<8} chunks={stats['chunks']} users={stats['users']} untimestamped={stats['untimestamped_chunks']} "
+        f"oldest={age} disk={stats['disk_mb']:.1f}MB query p50={stats['query_p50_ms']:.1f}ms p95={stats['query_p95_ms']:.1f}ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["stats", "compact"])
+    parser.add_argument("--path", default=core.CHROMA_PATH, help="Chroma directory")
+    parser.add_argument("--ttl", type=float, default=RETENTION_TTL, help="seconds to keep a session's chunks")
+    parser.add_argument("--probes", type=int, default=50, help="queries used to measure latency")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO"))
+    collection = core.setup_chromadb(args.path)
+    core.use_components(resume_collection=collection)
+    print_stats("before", collection_stats(collection, args.path, args.probes))
+    if args.command == "compact":
+        print(compact(collection, args.ttl, args.path, offline=True))
+        print_stats("after", collection_stats(collection, args.path, args.probes))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,273 @@
+import asyncio
+import heapq
+import itertools
+import os
+import threading
+import time
+from collections import Counter, namedtuple
+from concurrent.futures import Future
+
+import metrics
+
+# -------------------- Configuration --------------------
+# The provider's per-model limits; 0 leaves that dimension unlimited
+LLM_RPM = float(os.getenv("LLM_RPM", "0"))  # requests per minute
+LLM_TPM = float(os.getenv("LLM_TPM", "0"))  # prompt + completion tokens per minute
+# A smaller, faster model that takes LLM_FALLBACK_TASKS whenever the main model would make them wait
+LLM_FALLBACK_MODEL = os.getenv("LLM_FALLBACK_MODEL", "")  # e.g. llama-3.1-8b-instant
+LLM_FALLBACK_TASKS = {task.strip() for task in os.getenv("LLM_FALLBACK_TASKS", "strict_agent_monitor").split(",") if task.strip()}
+LLM_FALLBACK_RPM = float(os.getenv("LLM_FALLBACK_RPM", str(LLM_RPM)))
+LLM_FALLBACK_TPM = float(os.getenv("LLM_FALLBACK_TPM", str(LLM_TPM)))
+
+PRIORITY_CLASSES = ("high", "normal", "low")
+# Moderation keeps a turn from finishing; reports and question banks are background work
+TASK_PRIORITIES = {
+    "strict_agent_monitor": "high",
+    "report_agent": "low",
+    "question_plan": "low",
+}
+
+def task_priority(task):
+    return TASK_PRIORITIES.get(task, "normal")
+
+# -------------------- Rate Limits --------------------
+class TokenBucket:
+    """`per_minute` units refilled continuously, holding at most a minute's worth; 0 means unlimited"""
+
+    def __init__(self, per_minute):
+        self.capacity = per_minute
+        self.rate = per_minute / 60
+        self.level = per_minute
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount, now):
+        """Seconds until `amount` can be taken; requests larger than the bucket wait for a full one"""
+        if not self.capacity:
+            return 0.0
+        self._refill(now)
+        return max(min(amount, self.capacity) - self.level, 0.0) / self.rate
+
+    def take(self, amount, now):
+        if self.capacity:
+            self._refill(now)
+            self.level -= amount  # may go negative: completion tokens are only known afterwards
+
+
+class ModelLimiter:
+    """Request and token buckets of one model, with the calls waiting for them"""
+
+    def __init__(self, rpm, tpm):
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.paused_until = 0.0  # set after the provider answers 429
+        self.queue = []  # heap of (priority, arrival, tokens, enqueued_at, future)
+
+    def wait_time(self, tokens, now):
+        return max(self.paused_until - now, self.requests.wait_time(1, now), self.tokens.wait_time(tokens, now))
+
+    def take(self, tokens, now):
+        self.requests.take(1, now)
+        self.tokens.take(tokens, now)
+
+# -------------------- Scheduler --------------------
+Slot = namedtuple("Slot", "model tokens priority")
+
+
+class _Abandoned(Exception):
+    """Set on a shared call whose leader was cancelled: a follower issues the call again"""
+
+
+class RequestScheduler:
+    """Admission control shared by every LLM call in the process.
+
+    Calls that fit the model's buckets go out at once. The rest wait in a per-model queue
+    ordered by priority class, then arrival, and a dispatcher thread releases them as the
+    buckets refill. Identical calls in flight at the same time share one request.
+    """
+
+    def __init__(self, rpm=None, tpm=None, fallback_model=None, fallback_tasks=None, fallback_rpm=None, fallback_tpm=None):
+        self.rpm = LLM_RPM if rpm is None else rpm
+        self.tpm = LLM_TPM if tpm is None else tpm
+        self.fallback_model = LLM_FALLBACK_MODEL if fallback_model is None else fallback_model
+        self.fallback_tasks = LLM_FALLBACK_TASKS if fallback_tasks is None else set(fallback_tasks)
+        self.fallback_limits = (
+            LLM_FALLBACK_RPM if fallback_rpm is None else fallback_rpm,
+            LLM_FALLBACK_TPM if fallback_tpm is None else fallback_tpm,
+        )
+        self._limiters = {}
+        self._arrivals = itertools.count()
+        self._cond = threading.Condition()
+        self._thread = None
+        self._inflight = {}
+        self._inflight_lock = threading.Lock()
+
+    def _limiter(self, model):
+        limiter = self._limiters.get(model)
+        if limiter is None:
+            limits = self.fallback_limits if model == self.fallback_model else (self.rpm, self.tpm)
+            limiter = self._limiters[model] = ModelLimiter(*limits)
+        return limiter
+
+    def slot(self, task, model, tokens, priority=None):
+        """Where and how urgently to send one call of `task` estimated at `tokens` prompt tokens"""
+        if self.fallback_model and task in self.fallback_tasks:
+            with self._cond:
+                limiter = self._limiter(model)
+                if limiter.queue or limiter.wait_time(tokens, time.monotonic()) > 0:
+                    metrics.increment("llm_fallbacks_total", task=task)
+                    model = self.fallback_model
+        return Slot(model, tokens, priority or task_priority(task))
+
+    def submit(self, slot):
+        """A future that resolves, with the seconds spent queued, once `slot` may be sent"""
+        future = Future()
+        now = time.monotonic()
+        with self._cond:
+            limiter = self._limiter(slot.model)
+            if not limiter.queue and limiter.wait_time(slot.tokens, now) <= 0:
+                limiter.take(slot.tokens, now)
+                future.set_running_or_notify_cancel()
+                future.set_result(0.0)
+                return future
+            entry = (PRIORITY_CLASSES.index(slot.priority), next(self._arrivals), slot.tokens, now, future)
+            heapq.heappush(limiter.queue, entry)
+            self._publish_depth(slot.model, limiter)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._dispatch, name="llm-scheduler", daemon=True)
+                self._thread.start()
+            self._cond.notify()
+        return future
+
+    def acquire(self, slot):
+        return self.submit(slot).result()
+
+    async def aacquire(self, slot):
+        # Cancelling the waiting coroutine cancels the queued future, so it never takes a slot
+        return await asyncio.wrap_future(self.submit(slot))
+
+    def charge(self, model, tokens):
+        """Count completion tokens against the model once the response is in"""
+        with self._cond:
+            self._limiter(model).tokens.take(tokens, time.monotonic())
+
+    def pause(self, model, seconds):
+        """Hold every call to `model` for `seconds`, e.g. after the provider rate-limited us"""
+        with self._cond:
+            limiter = self._limiter(model)
+            limiter.paused_until = max(limiter.paused_until, time.monotonic() + seconds)
+            self._cond.notify()
+
+    def _publish_depth(self, model, limiter):
+        depth = Counter(PRIORITY_CLASSES[entry[0]] for entry in limiter.queue)
+        for priority in PRIORITY_CLASSES:
+            metrics.set_gauge("llm_queue_depth", depth[priority], model=model, priority=priority)
+
+    def _dispatch(self):
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                delay = None
+                for model, limiter in self._limiters.items():
+                    if not limiter.queue:
+                        continue
+                    while limiter.queue:
+                        priority, _, tokens, enqueued_at, future = limiter.queue[0]
+                        wait = 0.0 if future.cancelled() else limiter.wait_time(tokens, now)
+                        if wait > 0:
+                            delay = wait if delay is None else min(delay, wait)
+                            break
+                        heapq.heappop(limiter.queue)
+                        if future.set_running_or_notify_cancel():
+                            limiter.take(tokens, now)
+                            future.set_result(now - enqueued_at)
+                            metrics.observe("llm_queue_wait_seconds", now - enqueued_at, priority=PRIORITY_CLASSES[priority])
+                    self._publish_depth(model, limiter)
+                self._cond.wait(delay)
+
+    # -------------------- Coalescing --------------------
+    def _join(self, key):
+        with self._inflight_lock:
+            future = self._inflight.get(key)
+            if future is not None:
+                metrics.increment("llm_coalesced_total")
+                return future, False
+            future = self._inflight[key] = Future()
+            return future, True
+
+    def _leave(self, key, future, result=None, error=None):
+        with self._inflight_lock:
+            self._inflight.pop(key, None)
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    def coalesced(self, key, call):
+        """Return call(), sharing the result with identical calls (same `key`) made meanwhile.
+
+        Errors are shared too, but cancellation is not: when the leader is cancelled the
+        followers race to issue the call again.
+        """
+        while True:
+            future, leader = self._join(key)
+            if leader:
+                break
+            try:
+                return future.result()
+            except _Abandoned:
+                continue
+        try:
+            result = call()
+        except Exception as exc:
+            self._leave(key, future, error=exc)
+            raise
+        except BaseException:
+            self._leave(key, future, error=_Abandoned())
+            raise
+        self._leave(key, future, result)
+        return result
+
+    async def acoalesced(self, key, call):
+        while True:
+            future, leader = self._join(key)
+            if leader:
+                break
+            try:
+                # shield: a follower giving up must not cancel the leader's result for everyone else
+                return await asyncio.shield(asyncio.wrap_future(future))
+            except _Abandoned:
+                continue
+        try:
+            result = await call()
+        except Exception as exc:
+            self._leave(key, future, error=exc)
+            raise
+        except BaseException:  # cancelled: not an answer the followers should get
+            self._leave(key, future, error=_Abandoned())
+            raise
+        self._leave(key, future, result)
+        return result
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+def get_scheduler():
+    """Return the process-wide scheduler, created from the LLM_* settings on first use"""
+    global _scheduler
+    if _scheduler is None:
+        with _scheduler_lock:
+            if _scheduler is None:
+                _scheduler = RequestScheduler()
+    return _scheduler
+
+def set_scheduler(scheduler):
+    """Swap the process-wide scheduler and return the previous one"""
+    global _scheduler
+    with _scheduler_lock:
+        previous, _scheduler = _scheduler, scheduler
+    return previous
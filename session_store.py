@@ -0,0 +1,229 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+from interview_context import InterviewContext
+
+logger = logging.getLogger(__name__)
+
+# -------------------- Configuration --------------------
+SESSION_STORE = os.getenv("SESSION_STORE", "sqlite")  # "sqlite", "redis" or "none"
+SESSION_STORE_PATH = os.getenv("SESSION_STORE_PATH", "./sessions.sqlite3")
+SESSION_STORE_URL = os.getenv("SESSION_STORE_URL", "redis://localhost:6379/0")  # any Redis-compatible server
+SESSION_TTL = float(os.getenv("SESSION_TTL", str(24 * 3600)))  # seconds an idle session can be resumed
+COMPRESS_MIN_BYTES = 200  # zlib only pays off beyond short events
+
+# -------------------- Encoding --------------------
+def encode(value):
+    """Compact JSON, zlib-compressed when that is smaller; the first byte says which"""
+    data = json.dumps(value, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    if len(data) >= COMPRESS_MIN_BYTES:
+        packed = zlib.compress(data, 6)
+        if len(packed) < len(data):
+            return b"z" + packed
+    return b"j" + data
+
+def decode(blob):
+    blob = bytes(blob)
+    data = zlib.decompress(blob[1:]) if blob[:1] == b"z" else blob[1:]
+    return json.loads(data)
+
+# -------------------- Stores --------------------
+class SQLiteSessionStore:
+    """Turn logs and blobs in one SQLite file (WAL), shared by every worker on the host.
+
+    Each event is its own committed row, so a crash loses at most the event being written.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or SESSION_STORE_PATH
+        self._local = threading.local()  # one connection per thread
+        with self._connection() as connection:
+            connection.executescript("""
+                CREATE TABLE IF NOT EXISTS events (
+                    session_id TEXT NOT NULL, seq INTEGER NOT NULL, event BLOB NOT NULL, created REAL NOT NULL,
+                    PRIMARY KEY (session_id, seq)
+                ) WITHOUT ROWID;
+                CREATE TABLE IF NOT EXISTS blobs (
+                    session_id TEXT NOT NULL, name TEXT NOT NULL, value BLOB NOT NULL, created REAL NOT NULL,
+                    PRIMARY KEY (session_id, name)
+                ) WITHOUT ROWID;
+            """)
+
+    def _connection(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")  # WAL + NORMAL survives a process crash
+            self._local.connection = connection
+        return connection
+
+    def append(self, session_id, event):
+        with self._connection() as connection:
+            connection.execute(
+                "INSERT INTO events SELECT ?, COALESCE(MAX(seq), -1) + 1, ?, ? FROM events WHERE session_id = ?",
+                (session_id, encode(event), time.time(), session_id)
+            )
+
+    def events(self, session_id):
+        rows = self._connection().execute("SELECT event FROM events WHERE session_id = ? ORDER BY seq", (session_id,))
+        return [decode(event) for event, in rows]
+
+    def put(self, session_id, name, value):
+        with self._connection() as connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO blobs VALUES (?, ?, ?, ?)", (session_id, name, encode(value), time.time())
+            )
+
+    def get(self, session_id, name):
+        row = self._connection().execute(
+            "SELECT value FROM blobs WHERE session_id = ? AND name = ?", (session_id, name)
+        ).fetchone()
+        return decode(row[0]) if row else None
+
+    def delete(self, session_id):
+        with self._connection() as connection:
+            connection.execute("DELETE FROM events WHERE session_id = ?", (session_id,))
+            connection.execute("DELETE FROM blobs WHERE session_id = ?", (session_id,))
+
+    def expire(self, ttl=None):
+        """Delete sessions with no event for `ttl` seconds; returns how many were removed"""
+        cutoff = time.time() - (SESSION_TTL if ttl is None else ttl)
+        with self._connection() as connection:
+            stale = [row[0] for row in connection.execute(
+                "SELECT session_id FROM events GROUP BY session_id HAVING MAX(created) < ?", (cutoff,)
+            )]
+            connection.executemany("DELETE FROM events WHERE session_id = ?", [(s,) for s in stale])
+            connection.executemany("DELETE FROM blobs WHERE session_id = ?", [(s,) for s in stale])
+            connection.execute("DELETE FROM blobs WHERE created < ? AND session_id NOT IN (SELECT session_id FROM events)", (cutoff,))
+        return len(stale)
+
+
+class RedisSessionStore:
+    """Turn logs as Redis lists and blobs as hashes; the server's key TTL expires idle sessions"""
+
+    def __init__(self, url=None, ttl=None, prefix="interview:"):
+        import redis
+        self.client = redis.Redis.from_url(url or SESSION_STORE_URL)
+        self.ttl = int(SESSION_TTL if ttl is None else ttl)
+        self.prefix = prefix
+
+    def _keys(self, session_id):
+        return f"{self.prefix}{session_id}:events", f"{self.prefix}{session_id}:blobs"
+
+    def append(self, session_id, event):
+        events, blobs = self._keys(session_id)
+        with self.client.pipeline() as pipe:
+            pipe.rpush(events, encode(event))
+            pipe.expire(events, self.ttl)
+            pipe.expire(blobs, self.ttl)
+            pipe.execute()
+
+    def events(self, session_id):
+        return [decode(event) for event in self.client.lrange(self._keys(session_id)[0], 0, -1)]
+
+    def put(self, session_id, name, value):
+        blobs = self._keys(session_id)[1]
+        with self.client.pipeline() as pipe:
+            pipe.hset(blobs, name, encode(value))
+            pipe.expire(blobs, self.ttl)
+            pipe.execute()
+
+    def get(self, session_id, name):
+        value = self.client.hget(self._keys(session_id)[1], name)
+        return decode(value) if value is not None else None
+
+    def delete(self, session_id):
+        self.client.delete(*self._keys(session_id))
+
+    def expire(self, ttl=None):
+        return 0  # keys expire on their own
+
+
+def setup_session_store(kind=None):
+    kind = kind or SESSION_STORE
+    if kind == "sqlite":
+        return SQLiteSessionStore()
+    if kind == "redis":
+        return RedisSessionStore()
+    if kind == "none":
+        return None
+    raise ValueError(f"Unknown SESSION_STORE: {kind}")
+
+# -------------------- Replay --------------------
+def replay(events):
+    """Session state rebuilt from a turn log, with the same keys app.py keeps in st.session_state.
+
+    Events: ["resume", candidate_name, upload_key], ["start"], ["reset"], ["question", text],
+    ["answer", text], ["clarify", text], ["clarified", text] and ["end", reason or None].
+    """
+    state = {
+        "candidate_name": "Candidate",
+        "resume_upload": None,
+        "interview_active": False,
+        "interview_phase": "greeting",
+        "current_step": 0,
+        "questions": [],
+        "responses": [],
+        "needs_clarification": False,
+        "clarification_response": None,
+        "context": InterviewContext(),
+    }
+    for kind, *args in events:
+        if kind == "resume":
+            state["candidate_name"], upload_key = args
+            state["resume_upload"] = tuple(upload_key)
+        elif kind in ("start", "reset"):
+            state.update(
+                interview_active=kind == "start", interview_phase="greeting", current_step=0, questions=[],
+                responses=[], needs_clarification=False, clarification_response=None,
+                context=InterviewContext()
+            )
+        elif kind == "question":
+            if state["questions"]:
+                state["interview_phase"] = "technical"
+                state["current_step"] += 1
+            state["questions"].append(args[0])
+        elif kind == "answer":
+            question = state["questions"][state["current_step"]]
+            state["responses"].append({"question": question, "answer": args[0]})
+            state["context"] = state["context"].extended(question, args[0])
+        elif kind == "clarify":
+            state["needs_clarification"] = True
+            state["clarification_response"] = args[0]
+        elif kind == "clarified":
+            state["responses"][-1]["clarification"] = state["clarification_response"]
+            state["responses"][-1]["clarification_response"] = args[0]
+            state["needs_clarification"] = False
+            state["clarification_response"] = None
+        elif kind == "end":  # the reason, if moderation ended it, is kept for the record only
+            state["interview_active"] = False
+        else:
+            logger.warning("skipping unknown session event %r", kind)
+    return state
+
+
+class StoredReports:
+    """Report cache for get_report() kept in the session store rather than in session memory"""
+
+    def __init__(self, store, session_id):
+        self.store = store
+        self.session_id = session_id
+
+    def __contains__(self, key):
+        return self.store.get(self.session_id, f"report:{key}") is not None
+
+    def __getitem__(self, key):
+        from interview_core import Report
+        data = self.store.get(self.session_id, f"report:{key}")
+        if data is None:
+            raise KeyError(key)
+        return Report.from_dict(data)
+
+    def __setitem__(self, key, report):
+        self.store.put(self.session_id, f"report:{key}", report.to_dict())